@@ -8,7 +8,11 @@ from typing import List, Optional
 from langgraph.types import Command
 from .enums import Node
 from .prompts import Prompts
+from .types import Plan, CourseId
+from .validation import PlanViolation
+from .tools import plan_validator
 import logging
+import time
 import uuid
 
 info_logger = logging.getLogger("uvicorn.info")
@@ -150,4 +154,25 @@ async def get_chat(thread_id: str):
         "thread_id": results.config.get("configurable").get("thread_id")
     }
     
-    return response
\ No newline at end of file
+    return response
+
+class PlanValidationRequest(BaseModel):
+    plan: Plan
+    per_term_credits: float = 15
+    courses_taken: List[CourseId] = []
+    # courses moved, added or removed since `previous_violations`, only what they affect is re-checked,
+    # without previous violations the whole plan is
+    changed_course_ids: Optional[List[CourseId]] = None
+    changed_term_ids: List[str] = []
+    previous_violations: Optional[List[PlanViolation]] = None
+
+@router.post("/plans/validate")
+async def validate_plan(request: PlanValidationRequest):
+    """Structured violations of a user edited plan, incremental when the changed courses and previous violations are given"""
+    started = time.perf_counter()
+    validator = await plan_validator(request.plan, request.per_term_credits, request.courses_taken)
+    if request.changed_course_ids is not None and request.previous_violations is not None:
+        result = validator.revalidate(request.plan, request.previous_violations, request.changed_course_ids, request.changed_term_ids)
+    else:
+        result = validator.validate(request.plan)
+    return { **result, "time_ms": 1000 * (time.perf_counter() - started) }
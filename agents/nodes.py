@@ -5,7 +5,8 @@ from langchain_core.tools import BaseTool
 from langgraph.graph.message import add_messages, Messages
 from langgraph.graph import END
 from langgraph.types import interrupt, Command
-from .tools import ask_user, update_context, search_course, search_program, query_mcgill_knowledges, generate_base_plan
+from .tools import ask_user, update_context, search_course, search_program, query_mcgill_knowledges, get_course_details, get_program_details, generate_base_plan, generate_plan_variants, validate_plan, SEARCH_REQUESTS
+from database.mongodb import MongoDBClient
 from .types import Context, ContextUpdateDict, Question
 from .reducer import context_reducer
 from .prompts import Prompts
@@ -44,6 +45,33 @@ class ToolExecutionHandler:
     def __init__(self, tools: list):
         self.tools: Dict[str, BaseTool] = {tool.name: tool for tool in tools}
 
+    async def prefetch_searches(self, tool_calls: List[ToolCall]):
+        """
+        Run the sibling search calls of one turn together with hybrid_search_many.
+        Results land in the search result cache, so the tool invocations below are served from memory.
+        """
+        client = MongoDBClient.get_instance()
+        if not client.search_cache_enabled():
+            return
+
+        requests = []
+        for tool_call in tool_calls:
+            if tool_call["name"] not in SEARCH_REQUESTS or tool_call["name"] not in self.tools:
+                continue
+            try:
+                # same validation as tool.ainvoke, enum values and defaults filled in
+                args = self.tools[tool_call["name"]].args_schema.model_validate(tool_call["args"])
+                requests.append(SEARCH_REQUESTS[tool_call["name"]](**dict(args)))
+            except Exception:
+                continue # let the tool call itself report invalid arguments
+
+        if len(requests) < 2:
+            return
+        try:
+            await client.hybrid_search_many(requests)
+        except Exception as e:
+            error_logger.error(f"Batched search of {len(requests)} tool calls failed, running them one by one: {e}")
+
     async def __call__(self, state: OverallState) -> ToolNodeOutput:
         if not (tool_calls := state.get("tool_calls", [])):
             raise ValueError("No tool calls found in the state")
@@ -52,6 +80,8 @@ class ToolExecutionHandler:
         # user_info_update = None
         ask_user_call = None
         
+        await self.prefetch_searches(tool_calls)
+
         # execute the tool calls
         for tool_call in tool_calls:
             tool_name = tool_call["name"]
@@ -93,10 +123,10 @@ class ToolExecutionHandler:
 
                 for r in artifact:
                     context_id = ""
-                    if tool_name == search_program.name:
+                    if tool_name in (search_program.name, get_program_details.name):
                         context_id = f"{r["faculty"]} - {r["name"]}"
                         context_type = "program"
-                    elif tool_name == search_course.name:
+                    elif tool_name in (search_course.name, get_course_details.name):
                         context_id = r["id"]
                         context_type = "course"
                     elif tool_name == query_mcgill_knowledges.name:
@@ -105,6 +135,12 @@ class ToolExecutionHandler:
                     elif tool_name == generate_base_plan.name:
                         context_id = "new_plan"
                         context_type = "plan"
+                    elif tool_name == generate_plan_variants.name:
+                        context_id = r["id"]
+                        context_type = "plan"
+                    elif tool_name == validate_plan.name:
+                        context_id = "plan_validation"
+                        context_type = "plan"
                     else:
                         raise ValueError("tool name invalid: ", tool_name)
 
@@ -0,0 +1,120 @@
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from database.catalog import course_key
+from database.enums import AcademicLevel, CourseLevel, Department, Faculty
+from .types import CourseId, Plan
+import json
+import os
+import threading
+import time
+
+PlanCacheKey = Tuple[Tuple[str, ...], Tuple[str, ...], float, float, Tuple[str, ...], Tuple[str, ...], Tuple[str, ...], str]
+
+def _values(items: Iterable[Any]) -> Tuple[str, ...]:
+  return tuple(sorted({ getattr(i, "value", i) for i in items }))
+
+def plan_cache_key(
+  required_course_ids: List[CourseId],
+  complementary_course_ids: List[CourseId],
+  target_credits: float,
+  per_term_credits: float,
+  faculties: List[Faculty] = [],
+  departments: List[Department] = [],
+  course_levels: List[CourseLevel] = [],
+  academic_level: AcademicLevel = AcademicLevel.UGRAD
+) -> PlanCacheKey:
+  """Canonical key of generate_base_plan arguments, course id order, spelling and duplicates do not matter"""
+  return (
+    tuple(sorted({ course_key(c) for c in required_course_ids })),
+    tuple(sorted({ course_key(c) for c in complementary_course_ids })),
+    float(target_credits),
+    float(per_term_credits),
+    _values(faculties),
+    _values(departments),
+    _values(course_levels),
+    getattr(academic_level, "value", academic_level)
+  )
+
+class PlanCache:
+  """
+  LRU cache with TTL for generate_base_plan results, plans are deterministic for a given key and catalog.
+  Entries belong to one catalog version, a new version drops them all. Plans are kept json encoded,
+  every hit decodes a fresh plan so the agent can adjust it without touching the cached one.
+  """
+  def __init__(self, max_size: int = 256, ttl: float = 3600):
+    self.max_size = max_size
+    self.ttl = ttl
+    self.version: Optional[int] = None
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+    self.invalidations = 0
+    self._entries: OrderedDict[PlanCacheKey, Tuple[float, str]] = OrderedDict()
+    self._lock = threading.Lock()
+
+  def _check_version(self, version: Optional[int]):
+    if version != self.version:
+      if len(self._entries) > 0:
+        self.invalidations += 1
+      self._entries.clear()
+      self.version = version
+
+  def get(self, key: PlanCacheKey, version: Optional[int] = None) -> Optional[Plan]:
+    with self._lock:
+      self._check_version(version)
+      entry = self._entries.get(key, None)
+      if entry is not None and time.monotonic() - entry[0] > self.ttl:
+        del self._entries[key]
+        entry = None
+
+      if entry is None:
+        self.misses += 1
+        return None
+
+      self._entries.move_to_end(key)
+      self.hits += 1
+      encoded = entry[1]
+
+    return json.loads(encoded)
+
+  def put(self, key: PlanCacheKey, plan: Plan, version: Optional[int] = None):
+    if self.max_size <= 0:
+      return
+    encoded = json.dumps(plan, default=str)
+    with self._lock:
+      self._check_version(version)
+      self._entries[key] = (time.monotonic(), encoded)
+      self._entries.move_to_end(key)
+      while len(self._entries) > self.max_size:
+        self._entries.popitem(last=False)
+        self.evictions += 1
+
+  def invalidate(self):
+    with self._lock:
+      if len(self._entries) > 0:
+        self.invalidations += 1
+      self._entries.clear()
+
+  def stats(self) -> Dict[str, Any]:
+    with self._lock:
+      total = self.hits + self.misses
+      return {
+        "size": len(self._entries),
+        "max_size": self.max_size,
+        "ttl": self.ttl,
+        "version": self.version,
+        "hits": self.hits,
+        "misses": self.misses,
+        "evictions": self.evictions,
+        "invalidations": self.invalidations,
+        "hit_rate": self.hits / total if total > 0 else 0.0
+      }
+
+@lru_cache(maxsize=1)
+def get_plan_cache() -> PlanCache:
+  # PLAN_CACHE_SIZE=0 disables caching
+  return PlanCache(
+    max_size=int(os.getenv("PLAN_CACHE_SIZE") or 256),
+    ttl=float(os.getenv("PLAN_CACHE_TTL") or 3600)
+  )
@@ -0,0 +1,136 @@
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import lru_cache
+from typing import List, Optional
+from typing_extensions import NotRequired, TypedDict
+from database.enums import AcademicLevel, CourseLevel, Department, Faculty
+from .scheduler import CourseFetcher, fetch_plan_courses, schedule_base_plan
+from .types import CourseId, Plan
+import multiprocessing as mp
+import asyncio
+import logging
+import os
+import statistics
+
+info_logger = logging.getLogger("uvicorn.info")
+
+class PlanVariant(TypedDict):
+  per_term_credits: float
+  target_credits: float
+  course_levels: NotRequired[List[CourseLevel]]
+
+class PlanMetrics(TypedDict):
+  terms: int
+  total_credits: float
+  target_gap: float # credits still missing to reach the target, 0 if reached
+  min_term_credits: float
+  max_term_credits: float
+  term_credits_stdev: float # credit balance across terms, lower is more even
+  unplannable: int
+
+class PlanVariantResult(TypedDict):
+  id: str
+  variant: PlanVariant
+  plan: Plan
+  metrics: PlanMetrics
+
+def plan_metrics(plan: Plan, target_credits: float) -> PlanMetrics:
+  credits = [t["total_credits"] for t in plan["terms"].values() if len(t["course_ids"]) > 0] or [0]
+  return PlanMetrics(
+    terms=len(plan["terms"]),
+    total_credits=plan["total_credits"],
+    target_gap=max(0, target_credits - plan["total_credits"]),
+    min_term_credits=min(credits),
+    max_term_credits=max(credits),
+    term_credits_stdev=statistics.pstdev(credits),
+    unplannable=len(plan["notes"].get("unplannable_course", {}))
+  )
+
+def variant_id(variant: PlanVariant) -> str:
+  parts = [f"{variant['per_term_credits']:g}cr/term", f"target {variant['target_credits']:g}"]
+  if len(variant.get("course_levels", [])) > 0:
+    parts.append("levels " + ",".join(l.value for l in variant["course_levels"]))
+  return "plan variant " + " ".join(parts)
+
+def plan_workers() -> int:
+  # 0 (default) schedules in a thread of the API process. Scheduling 60 courses takes ~2ms and moving its
+  # arguments to a worker ~1ms, while each spawned worker imports the agents and database packages
+  # (torch and the embedding stack included), so processes only pay off for many large variants at once
+  return int(os.getenv("PLAN_WORKERS") or 0)
+
+@lru_cache(maxsize=1)
+def get_plan_executor() -> Optional[Executor]:
+  """Worker processes for plan scheduling if PLAN_WORKERS > 0, spawned once, they keep their parsed requisite trees between calls"""
+  workers = plan_workers()
+  if workers <= 0:
+    return None
+  info_logger.info(f"Starting {workers} plan worker(s)")
+  return ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"))
+
+async def run_scheduling(*args) -> Plan:
+  """schedule_base_plan off the event loop, in the plan workers when enabled"""
+  executor = get_plan_executor()
+  if executor is None:
+    return await asyncio.to_thread(schedule_base_plan, *args)
+  return await asyncio.wrap_future(executor.submit(schedule_base_plan, *args))
+
+async def generate_plan_variants(
+  fetch_courses: CourseFetcher,
+  course_ids: List[CourseId],
+  variants: List[PlanVariant],
+  faculties: List[Faculty],
+  departments: List[Department],
+  academic_level: AcademicLevel = AcademicLevel.UGRAD,
+  version: Optional[int] = None
+) -> List[PlanVariantResult]:
+  """
+  Plans of one course set under several parameters. Course data is fetched once for every variant
+  (complementary candidates for the union of their course levels), variants are scheduled in parallel.
+  """
+  # a variant without levels accepts any level, so does the shared query
+  levels: List[CourseLevel] = []
+  if all(len(v.get("course_levels", [])) > 0 for v in variants):
+    levels = list(dict.fromkeys(l for v in variants for l in v["course_levels"]))
+  courses, complementary = await fetch_plan_courses(
+    fetch_courses, course_ids, faculties, departments, levels, academic_level
+  )
+
+  plans = await asyncio.gather(*(
+    run_scheduling(
+      courses,
+      complementary,
+      course_ids,
+      v["target_credits"],
+      v["per_term_credits"],
+      v.get("course_levels", []),
+      version
+    )
+    for v in variants
+  ))
+
+  return [
+    PlanVariantResult(
+      id=variant_id(v),
+      # json serializable, results end up in the agent contexts
+      variant={ **v, "course_levels": [l.value for l in v.get("course_levels", [])] },
+      plan=plan,
+      metrics=plan_metrics(plan, v["target_credits"])
+    )
+    for v, plan in zip(variants, plans)
+  ]
+
+async def warm_plan_executor():
+  """Spawn the plan workers and import the planner in them before the first request"""
+  executor = get_plan_executor()
+  if executor is None:
+    return
+  await asyncio.gather(*(
+    asyncio.wrap_future(executor.submit(schedule_base_plan, [], [], [], 0))
+    for _ in range(plan_workers())
+  ))
+
+def shutdown_plan_executor():
+  if get_plan_executor.cache_info().currsize > 0:
+    executor = get_plan_executor()
+    if executor is not None:
+      executor.shutdown(wait=False, cancel_futures=True)
+    get_plan_executor.cache_clear()
@@ -89,10 +89,13 @@ class Prompts:
           - you first need to know which program user want to plan.
           - fetch the program from database using search_program tool.
           - ask user to provide the program name from the results.
+          - search results are summary cards, fetch the sections of the chosen program using get_program_details tool (and requisites of courses using get_course_details tool if needed).
           - analyze the program information, identify all course ids and credits required.
           - for complementary courses, if the options are not provided, you should fetch the courses from database that belong to the same faculty of the program.
           - then you MUST use generate_base_plan to generate a basic plan. Tell Jordan to use it as a basic plan but not the final plan, Jordan should adjust the plan to meet user's need.
           - the plan you generated will be added to context.
+          - when the user edits a plan (moves, adds or removes courses), use validate_plan with the changed course ids and the violations of the previous validation (plan_validation context) to check it, without a previous validation omit the changed course ids.
+          - if the user wants to compare workloads (e.g. 12, 15 or 17 credits per term), use generate_plan_variants once with every variant instead of several generate_base_plan calls.
         
         Output Guide:
 
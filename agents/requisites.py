@@ -0,0 +1,182 @@
+from typing import Dict, FrozenSet, NamedTuple, Optional, Set, Tuple, Union
+from functools import lru_cache
+from lark import Lark, Transformer, LarkError
+from database.catalog import course_key
+from database.enums import CourseLevel
+from database.types import Course
+import logging
+import re
+
+error_logger = logging.getLogger("uvicorn.error")
+
+# Requisites["parsed"] strings, e.g. "(COMP 250 | COMP 240) + MATH 133 + 6-23-comp-math"
+#   +        all of
+#   | or /   any of, binds looser than +
+#   N-LL-SUBJ(-SUBJ)*   N credits of courses of levels LL (one character per level) in the subjects
+REQUISITE_GRAMMAR = r"""
+  ?start: any_of
+  ?any_of: all_of (("|" | "/") all_of)*
+  ?all_of: atom ("+" atom)*
+  ?atom: COURSE -> course
+       | CREDITS -> credits
+       | "(" any_of ")"
+
+  COURSE: /[a-zA-Z]{4}\s*[0-9]{3}[a-zA-Z0-9]*/
+  CREDITS: /[0-9]{1,2}-[0-9a-zA-Z]+(-[a-zA-Z]{4})+/
+
+  %import common.WS
+  %ignore WS
+"""
+
+class CreditRequirement(NamedTuple):
+  credits: float
+  course_levels: Tuple[CourseLevel, ...]
+  subject_codes: Tuple[str, ...]
+
+class AllOf(NamedTuple):
+  items: Tuple["Requirement", ...]
+
+class AnyOf(NamedTuple):
+  items: Tuple["Requirement", ...]
+
+# leaves are course keys (database.catalog.course_key)
+Requirement = Union[str, CreditRequirement, AllOf, AnyOf]
+
+def map_course_level(level: str) -> CourseLevel:
+  return CourseLevel["LEVEL_" + level[0].upper() + "00"]
+
+def parse_credit_requirement(text: str) -> CreditRequirement:
+  items = text.lower().split("-")
+  return CreditRequirement(
+    credits=float(items[0]),
+    course_levels=tuple(map_course_level(char) for char in items[1]),
+    subject_codes=tuple(items[2:])
+  )
+
+def _flatten(kind, items) -> Requirement:
+  flat = []
+  for item in items:
+    flat.extend(item.items if isinstance(item, kind) else [item])
+  flat = list(dict.fromkeys(flat))
+  return flat[0] if len(flat) == 1 else kind(tuple(flat))
+
+class RequisiteTransformer(Transformer):
+  def course(self, children):
+    return course_key(children[0])
+
+  def credits(self, children):
+    return parse_credit_requirement(children[0])
+
+  def all_of(self, children):
+    return _flatten(AllOf, children)
+
+  def any_of(self, children):
+    return _flatten(AnyOf, children)
+
+# LALR with an inline transformer builds the tree in a single pass
+_parser = Lark(REQUISITE_GRAMMAR, parser="lalr", transformer=RequisiteTransformer())
+
+_CREDITS_PATTERN = re.compile(r"[0-9]{1,2}-[0-9]{1,}(-[a-zA-Z]{4})+", flags=re.IGNORECASE | re.MULTILINE)
+_COURSE_PATTERN = re.compile(r"[^+\|\-\(\)\/]+", flags=re.IGNORECASE | re.MULTILINE)
+
+def _parse_flat(parsed: str) -> Optional[Requirement]:
+  """Fallback for strings outside the grammar, every course id and credit group becomes required"""
+  credit_groups = [parse_credit_requirement(m.group()) for m in _CREDITS_PATTERN.finditer(parsed)]
+  rest = _CREDITS_PATTERN.sub("", parsed)
+  ids = [course_key(m.group()) for m in _COURSE_PATTERN.finditer(rest) if m.group().strip() != ""]
+  items = [*ids, *credit_groups]
+  if len(items) == 0:
+    return None
+  return _flatten(AllOf, items)
+
+@lru_cache(maxsize=8192)
+def parse_requisites(parsed: Optional[str]) -> Optional[Requirement]:
+  """AND/OR/credit group tree of a Requisites["parsed"] string, None if there is no requirement"""
+  if parsed is None or parsed.strip() == "":
+    return None
+  try:
+    return _parser.parse(parsed)
+  except LarkError:
+    error_logger.warning(f"Requisites outside the grammar, reading them as a flat list: {parsed!r}")
+    return _parse_flat(parsed)
+
+class RequisiteCache:
+  """
+  Parsed requisite trees memoized by course id and catalog version, so plan generation and eligibility
+  checks never re-parse requisite strings. A new catalog version drops every tree.
+  """
+  def __init__(self):
+    self.version: Optional[int] = None
+    self.trees: Dict[Tuple[str, str], Optional[Requirement]] = {}
+    self.hits = 0
+    self.misses = 0
+
+  def get(self, course: Course, field: str, version: Optional[int] = None) -> Optional[Requirement]:
+    # without a catalog version documents may change under the same id, the string itself is the key
+    if version is None:
+      return parse_requisites((course.get(field) or {}).get("parsed"))
+    if version != self.version:
+      self.version = version
+      self.trees.clear()
+
+    key = (course_key(course["id"]), field)
+    if key in self.trees:
+      self.hits += 1
+      return self.trees[key]
+    self.misses += 1
+    tree = parse_requisites((course.get(field) or {}).get("parsed"))
+    self.trees[key] = tree
+    return tree
+
+  def stats(self):
+    return { "version": self.version, "trees": len(self.trees), "hits": self.hits, "misses": self.misses }
+
+requisite_cache = RequisiteCache()
+
+def course_ids(tree: Optional[Requirement]) -> FrozenSet[str]:
+  """Every course key mentioned by a requirement"""
+  if tree is None or isinstance(tree, CreditRequirement):
+    return frozenset()
+  if isinstance(tree, str):
+    return frozenset([tree])
+  return frozenset().union(*(course_ids(item) for item in tree.items))
+
+def credit_requirements(tree: Optional[Requirement]) -> Tuple[CreditRequirement, ...]:
+  if tree is None or isinstance(tree, str):
+    return ()
+  if isinstance(tree, CreditRequirement):
+    return (tree,)
+  return tuple(c for item in tree.items for c in credit_requirements(item))
+
+def is_satisfied(tree: Optional[Requirement], taken: Set[str], credits: Dict[str, float] = {}) -> bool:
+  """
+  Whether taken courses (course keys) meet a requirement.
+  Credit groups count the credits of taken courses of the listed subjects and levels, 3 per course if unknown.
+  """
+  if tree is None:
+    return True
+  if isinstance(tree, str):
+    return tree in taken
+  if isinstance(tree, CreditRequirement):
+    levels = { l.value[0] for l in tree.course_levels }
+    total = sum(
+      credits.get(key, 3) for key in taken
+      if key[:4] in tree.subject_codes and key[4:5] in levels
+    )
+    return total >= tree.credits
+  if isinstance(tree, AllOf):
+    return all(is_satisfied(item, taken, credits) for item in tree.items)
+  return any(is_satisfied(item, taken, credits) for item in tree.items)
+
+def format_requirement(tree: Optional[Requirement]) -> str:
+  if tree is None:
+    return ""
+  if isinstance(tree, str):
+    return tree
+  if isinstance(tree, CreditRequirement):
+    return f"{tree.credits:g} credits of {'/'.join(l.value for l in tree.course_levels)} level {'/'.join(tree.subject_codes)}"
+  separator = " + " if isinstance(tree, AllOf) else " | "
+  return separator.join(
+    f"({format_requirement(item)})" if isinstance(item, (AllOf, AnyOf)) else format_requirement(item)
+    for item in tree.items
+  )
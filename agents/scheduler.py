@@ -0,0 +1,270 @@
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from database.catalog import course_key
+from database.enums import AcademicLevel, CourseLevel, Department, Faculty
+from database.types import Course
+from .types import CourseId, Plan, Term
+from .requisites import requisite_cache, course_ids
+import heapq
+
+class CourseNode:
+  """A course of the plan with the course keys of its requisites, from trees memoized per catalog version"""
+  __slots__ = ("key", "course", "prereqs", "coreqs", "antireqs", "order")
+
+  def __init__(self, course: Course, version: Optional[int] = None):
+    self.key = course_key(course["id"])
+    self.course = course
+    self.prereqs = course_ids(requisite_cache.get(course, "prerequisites", version))
+    self.coreqs = course_ids(requisite_cache.get(course, "corequisites", version))
+    self.antireqs = course_ids(requisite_cache.get(course, "restrictions", version))
+    # deterministic tie break, by course number then subject, whatever the input order
+    self.order = (course["id"][4:], course["id"])
+
+class PlanScheduler:
+  """
+  Term scheduler of generate_base_plan.
+
+  Courses of one call form a DAG: a prerequisite must be in an earlier term, a corequisite in the same or an earlier term.
+  Courses are taken in topological order (course number breaks ties) and placed first fit, from the earliest term their
+  planned requisites allow, in a term with enough remaining credits, preferring a term holding one of their corequisites.
+  A course that fits nowhere opens a new term. Requisites outside the plan are assumed taken.
+
+  Term membership is a dict from course key to term index, so every check is a set lookup.
+  `schedule` can be called again with more courses (e.g. complementary ones), they are planned after the placed ones.
+  """
+  def __init__(self, per_term_credits: float, target_credits: Optional[float] = None, version: Optional[int] = None):
+    self.per_term_credits = per_term_credits
+    self.target_credits = target_credits
+    self.version = version # catalog version the courses come from, None if read from the database
+    self.plan: Plan = {
+      "terms": {},
+      "notes": {},
+      "total_credits": 0
+    }
+    self.term_ids: List[str] = []
+    self.term_of: Dict[str, int] = {} # course key -> index of its term
+    self.restricted_by: Dict[str, Set[str]] = {} # course key -> planned courses restricting it
+    self.planned: List[Course] = []
+    self._add_term()
+
+  @property
+  def done(self) -> bool:
+    return self.target_credits is not None and self.plan["total_credits"] >= self.target_credits
+
+  def _add_term(self) -> int:
+    index = len(self.term_ids)
+    term_id = f"term_{index + 1}"
+    self.plan["terms"][term_id] = Term(
+      id=term_id,
+      name=f"Term {index + 1}",
+      course_ids=[],
+      total_credits=0,
+    )
+    self.term_ids.append(term_id)
+    return index
+
+  def _term(self, index: int) -> Term:
+    return self.plan["terms"][self.term_ids[index]]
+
+  def _topological_order(self, nodes: Dict[str, CourseNode]) -> List[CourseNode]:
+    """Kahn's algorithm over the requisites within `nodes`, cycles are broken at the first course in tie break order"""
+    dependents: Dict[str, List[str]] = { key: [] for key in nodes }
+    indegree: Dict[str, int] = {}
+    for key, node in nodes.items():
+      requisites = (node.prereqs | node.coreqs) & nodes.keys()
+      requisites.discard(key)
+      indegree[key] = len(requisites)
+      for r in requisites:
+        dependents[r].append(key)
+
+    ready = [(node.order, key) for key, node in nodes.items() if indegree[key] == 0]
+    heapq.heapify(ready)
+    blocked = { key for key, degree in indegree.items() if degree > 0 }
+    order: List[CourseNode] = []
+    while len(order) < len(nodes):
+      if len(ready) == 0:
+        # requisite cycle, e.g. mutual corequisites
+        _, key = min((nodes[key].order, key) for key in blocked)
+        blocked.discard(key)
+        if (nodes[key].prereqs - { key }) & blocked:
+          self.plan["notes"].setdefault("cyclic_requisites", []).append(nodes[key].course["id"])
+        heapq.heappush(ready, (nodes[key].order, key))
+
+      _, key = heapq.heappop(ready)
+      order.append(nodes[key])
+      for dependent in dependents[key]:
+        if dependent in blocked:
+          indegree[dependent] -= 1
+          if indegree[dependent] == 0:
+            blocked.discard(dependent)
+            heapq.heappush(ready, (nodes[dependent].order, dependent))
+    return order
+
+  def _place(self, node: CourseNode) -> bool:
+    # restrictions in both directions, against every planned course
+    conflicts = (node.antireqs & self.term_of.keys()) | self.restricted_by.get(node.key, set())
+    if conflicts:
+      unplannable = self.plan["notes"].setdefault("unplannable_course", {})
+      unplannable[node.course["id"]] = "antireq not met: " + ", ".join(sorted(conflicts))
+      return False
+
+    earliest = 0
+    for r in node.prereqs:
+      if r in self.term_of:
+        earliest = max(earliest, self.term_of[r] + 1)
+    for r in node.coreqs:
+      if r in self.term_of:
+        earliest = max(earliest, self.term_of[r])
+    coreq_terms = { self.term_of[r] for r in node.coreqs if r in self.term_of }
+
+    credits = node.course["credits"]
+    chosen = None
+    for index in range(earliest, len(self.term_ids)):
+      if self._term(index)["total_credits"] + credits > self.per_term_credits:
+        continue
+      if index in coreq_terms:
+        chosen = index
+        break
+      if chosen is None:
+        chosen = index
+    if chosen is None:
+      chosen = self._add_term()
+
+    term = self._term(chosen)
+    term["course_ids"].append(node.course["id"])
+    term["total_credits"] += credits
+    self.plan["total_credits"] += credits
+    self.term_of[node.key] = chosen
+    for r in node.antireqs:
+      self.restricted_by.setdefault(r, set()).add(node.course["id"])
+    self.planned.append(node.course)
+    return True
+
+  def schedule(self, courses: Iterable[Course]) -> List[Course]:
+    """Plan the given courses until the target credits are reached, returns the newly planned courses"""
+    nodes: Dict[str, CourseNode] = {}
+    for course in courses:
+      node = CourseNode(course, self.version)
+      if node.key not in self.term_of and node.key not in nodes:
+        nodes[node.key] = node
+
+    planned: List[Course] = []
+    for node in self._topological_order(nodes):
+      if self.done:
+        break
+      if self._place(node):
+        planned.append(node.course)
+    return planned
+
+  def future_course_ids(self) -> List[CourseId]:
+    """Courses opened by the planned ones, candidates for complementary courses"""
+    return [c for course in self.planned for c in course.get("futureCourses", [])]
+
+# keyword arguments of generate_course_id_pipeline -> matching courses, from the catalog or the database
+CourseFetcher = Callable[..., Awaitable[List[Course]]]
+
+# complementary expansion depth: courses opened by the requested ones, then the ones those open, ...
+COMPLEMENTARY_ROUNDS = 3
+
+async def fetch_plan_courses(
+  fetch_courses: CourseFetcher,
+  course_ids: List[CourseId],
+  faculties: List[Faculty],
+  departments: List[Department],
+  course_levels: List[CourseLevel] = [],
+  academic_level: AcademicLevel = AcademicLevel.UGRAD,
+  rounds: int = COMPLEMENTARY_ROUNDS
+) -> Tuple[List[Course], List[Course]]:
+  """
+  Requested courses and the complementary candidates they may open: their futureCourses in the faculties
+  and departments, then the futureCourses of those, for up to `rounds` rounds. One query per round,
+  so planning itself needs no I/O
+  """
+  course_ids = [course_key(c) for c in course_ids]
+  courses = [Course(**c) for c in await fetch_courses(included_ids=course_ids)]
+
+  complementary: List[Course] = []
+  fetched = set(course_ids)
+  opening = courses
+  for _ in range(rounds):
+    future_ids = [
+      c for c in dict.fromkeys(c for course in opening for c in course.get("futureCourses", []))
+      if course_key(c) not in fetched
+    ]
+    if len(future_ids) == 0:
+      break
+    fetched.update(course_key(c) for c in future_ids)
+    opening = [Course(**c) for c in await fetch_courses(
+      included_ids=future_ids,
+      excluded_ids=course_ids,
+      faculties=faculties,
+      departments=departments,
+      excluded_levels=[CourseLevel.LEVEL_000, CourseLevel.LEVEL_100],
+      included_levels=course_levels,
+      academic_level=academic_level
+    )]
+    complementary.extend(opening)
+  return courses, complementary
+
+def schedule_base_plan(
+  courses: List[Course],
+  complementary: List[Course],
+  course_ids: List[CourseId],
+  target_credits: float,
+  per_term_credits: float = 15,
+  course_levels: List[CourseLevel] = [],
+  version: Optional[int] = None,
+  rounds: int = COMPLEMENTARY_ROUNDS
+) -> Plan:
+  """
+  Plan of generate_base_plan: the requested courses, then complementary ones opened by the planned courses
+  until the target credits, each round adding the courses opened by the previous one, up to `rounds` rounds.
+  CPU only, arguments and result are picklable for a process pool.
+  """
+  scheduler = PlanScheduler(per_term_credits, target_credits, version)
+  plan = scheduler.plan
+
+  # verify if any missing course ids
+  fetched_course_ids = { course_key(c["id"]) for c in courses }
+  diff = [id for id in (course_key(c) for c in course_ids) if id not in fetched_course_ids]
+  if len(diff) > 0:
+    plan["notes"].update({ "invalid_course_ids": diff })
+
+  scheduler.schedule(courses)
+
+  # add additional complementary courses if not enough credits
+  levels = { l.value for l in course_levels }
+  candidates: Dict[str, Course] = { course_key(c["id"]): c for c in complementary }
+  for _ in range(rounds):
+    if plan["total_credits"] >= target_credits or len(candidates) == 0:
+      break
+    future_ids = { course_key(c) for c in scheduler.future_course_ids() }
+    opened = [
+      c for key, c in candidates.items()
+      if key in future_ids
+        and key not in scheduler.term_of
+        and (len(levels) == 0 or c.get("courseLevel") in levels)
+        and c["credits"] + plan["total_credits"] <= target_credits
+    ]
+    # a candidate is tried once, unplannable ones are not retried in later rounds
+    for c in opened:
+      candidates.pop(course_key(c["id"]))
+    if len(scheduler.schedule(opened)) == 0:
+      break
+
+  return plan
+
+async def build_base_plan(
+  fetch_courses: CourseFetcher,
+  course_ids: List[CourseId],
+  target_credits: float,
+  faculties: List[Faculty],
+  departments: List[Department],
+  per_term_credits: float = 15,
+  course_levels: List[CourseLevel] = [],
+  academic_level: AcademicLevel = AcademicLevel.UGRAD,
+  version: Optional[int] = None
+) -> Plan:
+  courses, complementary = await fetch_plan_courses(
+    fetch_courses, course_ids, faculties, departments, course_levels, academic_level
+  )
+  return schedule_base_plan(courses, complementary, course_ids, target_credits, per_term_credits, course_levels, version)
@@ -1,15 +1,71 @@
-from typing import List, Annotated
+from typing import Callable, Dict, List, Optional, Annotated
 from langchain_core.tools import BaseTool, tool
-from database.types import Course, Program
+from database.types import Course, Program, SearchRequest
 from database.mongodb import MongoDBClient
-from database.enums import AcademicLevel, Faculty, Department, Degree, MongoCollection, CourseLevel
-from database.utils import generate_course_id_pipeline
-from .utils import parse_req
-from .types import ContextUpdateDict, CourseId, Term, Plan
+from database.enums import AcademicLevel, Faculty, Department, Degree, MongoCollection, CourseLevel, ProjectionProfile
+from database.utils import generate_course_id_pipeline, generate_course_id_match, generate_name_match
+from .scheduler import CourseFetcher, fetch_plan_courses
+from .plan_variants import PlanVariant, run_scheduling, generate_plan_variants as generate_plan_variants_for
+from .plan_cache import get_plan_cache, plan_cache_key
+from .validation import PlanValidator, PlanViolation, plan_course_ids
+from .types import ContextUpdateDict, CourseId, Plan
 import logging
 
 info_logger = logging.getLogger("uvicorn.info")
 
+def program_search_request(
+  query: str,
+  n_results: int = 3,
+  level: AcademicLevel = AcademicLevel.UGRAD,
+  faculty: List[Faculty] = [],
+  department: List[Department] = [],
+  degree: List[Degree] = [],
+  detail: ProjectionProfile = ProjectionProfile.CARD
+) -> SearchRequest:
+  return SearchRequest(
+    query=query,
+    collection=MongoCollection.Program,
+    n_results=n_results,
+    filter={
+      "level": [1, 2] if level == AcademicLevel.ALL else (1 if level == AcademicLevel.UGRAD else 2),
+      "faculty": [f.value for f in faculty],
+      "department": [d.value for d in department],
+      "degree": [d.value for d in degree]
+    },
+    projection=detail
+  )
+
+def course_search_request(
+  query: str,
+  n_credits_limit: float | List[float] = [],
+  n_results: int = 3,
+  course_level: List[CourseLevel] = [],
+  academic_level: AcademicLevel = AcademicLevel.UGRAD,
+  faculty: List[Faculty] = [],
+  department: List[Department] = [],
+  detail: ProjectionProfile = ProjectionProfile.CARD
+) -> SearchRequest:
+  return SearchRequest(
+    query=query,
+    n_results=n_results,
+    collection=MongoCollection.Course,
+    filter={
+      "academicLevel": 0 if academic_level == AcademicLevel.ALL else [0, 1 if academic_level == AcademicLevel.UGRAD else 2],
+      "courseLevel": [l.value for l in course_level],
+      "credits": n_credits_limit,
+      "faculty": [f.value for f in faculty],
+      "department": [d.value for d in department]
+    },
+    projection=detail
+  )
+
+def knowledge_search_request(query: str, n_results: int = 3) -> SearchRequest:
+  return SearchRequest(
+    query=query,
+    collection=MongoCollection.General,
+    n_results=n_results
+  )
+
 @tool(response_format="content_and_artifact")
 async def search_program(
   query: Annotated[str, "The query string"],
@@ -19,26 +75,17 @@ async def search_program(
   # TODO: rethink about this?
   faculty: Annotated[List[Faculty], "the faculty filter, default to empty"] = [],
   department: Annotated[List[Department], "the department filter, default to empty"] = [],
-  degree: Annotated[List[Degree], "the degree filter, default to empty"] = []
+  degree: Annotated[List[Degree], "the degree filter, default to empty"] = [],
+  detail: Annotated[ProjectionProfile, "fields returned: 'card' (summary), 'requisites' (with program sections) or 'full', default is card"] = ProjectionProfile.CARD
 ):
   """
   Search programs offered at McGill. Multiple filters applicable with default values.
   Make sure you are using correct enum value for filters like faculty or department.
   This tool is ONLY used to search program information.
+  Results are summary cards by default, use get_program_details for the sections of programs you found.
   """
   client = MongoDBClient.get_instance()
-  results = await client.hybrid_search(
-    query=query,
-    collection=MongoCollection.Program,
-    n_results=n_results,
-    filter={
-      "level": [1, 2] if level == AcademicLevel.ALL else (1 if level == AcademicLevel.UGRAD else 2),
-      "faculty": [f.value for f in faculty],
-      "department": [d.value for d in department],
-      "degree": [d.value for d in degree]
-    },
-    # proj={ "sections": 0 } if not show_requirement else {}
-  )
+  results = await client.hybrid_search(**program_search_request(query, n_results, level, faculty, department, degree, detail))
 
   return "search_program resutls", [Program(**r) for r in results];
 
@@ -53,24 +100,17 @@ async def search_course(
   # TODO: rethink about this
   faculty: Annotated[List[Faculty], "the faculty filter, default to empty"] = [],
   department: Annotated[List[Department], "the department filter, default to empty"] = [],
+  detail: Annotated[ProjectionProfile, "fields returned: 'card' (summary), 'requisites' (with prerequisites, corequisites and restrictions) or 'full', default is card"] = ProjectionProfile.CARD
 ):
   """
   Search courses offered at McGill. Multiple filters applicable with default values.
   Make sure you are using correct enum value for filters like faculty or department.
   This tool is ONLY used to search relevant course information
+  Results are summary cards by default, use get_course_details for the requisites or full description of courses you found.
   """
   client = MongoDBClient.get_instance()
   results = await client.hybrid_search(
-    query=query,
-    n_results=n_results,
-    collection=MongoCollection.Course,
-    filter={
-      "academicLevel": 0 if academic_level == AcademicLevel.ALL else [0, 1 if academic_level == AcademicLevel.UGRAD else 2],
-      "courseLevel": [l.value for l in course_level],
-      "credits": n_credits_limit,
-      "faculty": [f.value for f in faculty],
-      "department": [d.value for d in department]
-    }
+    **course_search_request(query, n_credits_limit, n_results, course_level, academic_level, faculty, department, detail)
   )
 
   return "search_course_result", [Course(**r) for r in results];
@@ -84,14 +124,53 @@ async def query_mcgill_knowledges(
   Semantically query McGill knowledges database.
   """
   client = MongoDBClient.get_instance()
-  results = await client.hybrid_search(
-    query=query,
-    collection=MongoCollection.General,
-    n_results=n_results
-  )
+  results = await client.hybrid_search(**knowledge_search_request(query, n_results))
 
   return "query_mcgill results", results;
 
+@tool(response_format="content_and_artifact")
+async def get_course_details(
+  course_ids: Annotated[List[CourseId], "ids of the courses, e.g. COMP 250"],
+  detail: Annotated[ProjectionProfile, "fields returned: 'requisites' (prerequisites, corequisites and restrictions) or 'full', default is full"] = ProjectionProfile.FULL
+):
+  """
+  Fetch more details of courses you already know the id of, e.g. from search_course cards.
+  """
+  if len(course_ids) == 0:
+    return "get_course_details results", [];
+
+  client = MongoDBClient.get_instance()
+  results = await client.find_documents(
+    MongoCollection.Course, generate_course_id_match(course_ids), detail, limit=len(course_ids)
+  )
+
+  return "get_course_details results", [Course(**r) for r in results];
+
+@tool(response_format="content_and_artifact")
+async def get_program_details(
+  program_names: Annotated[List[str], "exact names of the programs, as returned by search_program"],
+  detail: Annotated[ProjectionProfile, "fields returned: 'requisites' (program sections) or 'full', default is full"] = ProjectionProfile.FULL
+):
+  """
+  Fetch more details of programs you already know the name of, e.g. the sections (required and complementary courses) of a search_program card.
+  """
+  if len(program_names) == 0:
+    return "get_program_details results", [];
+
+  client = MongoDBClient.get_instance()
+  results = await client.find_documents(
+    MongoCollection.Program, generate_name_match(program_names), detail, limit=len(program_names)
+  )
+
+  return "get_program_details results", [Program(**r) for r in results];
+
+# search tools whose calls can be batched through MongoDBClient.hybrid_search_many
+SEARCH_REQUESTS: Dict[str, Callable[..., SearchRequest]] = {
+  search_program.name: program_search_request,
+  search_course.name: course_search_request,
+  query_mcgill_knowledges.name: knowledge_search_request,
+}
+
 @tool
 def update_context(updates: List[ContextUpdateDict]):
   """
@@ -113,6 +192,19 @@ def ask_user(
   """
   return question, options;
 
+async def course_fetcher(client: MongoDBClient) -> CourseFetcher:
+  """Course lookups of plan generation, from the in-memory catalog when loaded, else with atlas search"""
+  catalog = client.course_catalog()
+  if catalog is not None:
+    async def fetch_courses(**filter) -> List[Course]:
+      return catalog.scan(**filter)
+  else:
+    coll = await client.get_async_collection(MongoCollection.Course)
+    async def fetch_courses(**filter) -> List[Course]:
+      results = await coll.aggregate(pipeline=generate_course_id_pipeline(**filter))
+      return await results.to_list()
+  return fetch_courses
+
 @tool(response_format="content_and_artifact")
 async def generate_base_plan(
   required_course_ids: Annotated[List[CourseId], "course id to be put in the plan"], 
@@ -135,166 +227,110 @@ async def generate_base_plan(
   course_ids = required_course_ids + complementary_course_ids
   if len(course_ids) == 0:
     return "plan", [Plan(terms={}, notes={}, total_credits=0)];
-  # sort by level
-  course_ids = list(map(lambda c: c.lower().replace(" ", ""), course_ids))
-  course_ids = sorted(course_ids, key=lambda id: id[4:])
-
-  # fetch informations
-  coll = await MongoDBClient.get_instance().get_async_collection(MongoCollection.Course)
-  pipeline = generate_course_id_pipeline(course_ids)
-  # info_logger.info(f"pipeline: {pipeline}")
-  results = await coll.aggregate(pipeline=pipeline)
-  results = await results.to_list()
-  courses: List[Course] = [Course(**c) for c in results]
-  courses.sort(key=lambda c: c["id"][4:])
-
-  # info_logger.info(f"courseids: {course_ids}")
-  # info_logger.info(f"result courses: {[c['id'] for c in courses]}")
-
-  plan: Plan = {
-    "terms": {
-      "term_1": Term(
-        id="term_1",
-        name="Term 1",
-        course_ids=[],
-        total_credits=0,
-      )
-    },
-    "notes": {},
-    "total_credits": 0
-  }
-
-  terms = plan["terms"]
-  notes = plan["notes"]
-
-  # verify if any missing course ids
-  fetched_course_ids: List[str] = list(map(lambda c: c["id"], courses))
-  if len(fetched_course_ids) != len(course_ids):
-    diff = [id for id in course_ids if id not in fetched_course_ids]
-    notes.update({ "invalid_course_ids": diff })
-
-  added_additional_courses = False
-  possible_future_courses: List[CourseId] = []
-  planned_courses: List[CourseId] = []
-
-  while len(courses) > 0:
-    course = courses.pop(0)
-    prereq_ids, _ = parse_req(course["prerequisites"])
-    coreq_ids, _ = parse_req(course["corequisites"])
-    antireq_ids, _ = parse_req(course["restrictions"])
-
-
-
-    # info_logger.info(f"current course: {course['id']}")
-    # info_logger.info(f"prereq_ids: {prereq_ids}")
-    # info_logger.info(f"coreq_ids: {coreq_ids}")
-    # info_logger.info(f"antireq_ids: {antireq_ids}")
-    # subject_code = course["id"][:4]
-
-    # find the first term after any prereq and before any antireq that:
-    # 1. has enough credits
-    # 2. preferred if has a coreq
-
-    planned = False
-    # find the first term that has enough credits
-    first_possible_term = None
-    possible_term_with_coreq = None
-    plannable = True
-
-    # first verify if any antireq exists in any term
-    # this means we cannot plan this course in any term
-    for term in terms.values():
-      if any(antireq_id in term["course_ids"] for antireq_id in antireq_ids):
-        notes.update({ "unplannable_course": notes.get("unplannable_course", {}) })
-        notes["unplannable_course"][course["id"]] = "antireq not met: " + ", ".join(antireq_ids)
-        plannable = False
-        break
-
-    # info_logger.info(f"plannable: {plannable}")
-    last_prereq_term_idx = 0
-    for i, term in enumerate(reversed(list(terms.values()))):
-      if any(prereq_id in term["course_ids"] for prereq_id in prereq_ids):
-        last_prereq_term_idx = len(terms) - 1 - i
-        break
-
-    # info_logger.info(f"last_prereq_term_idx: {last_prereq_term_idx}")
-
-    if not plannable:
-      continue
-
-    for term in list(terms.values())[last_prereq_term_idx:]: # order guaranteed
-      # check if enough remaining credits
-      if term["total_credits"] + course["credits"] > per_term_credits:
-        continue
-
-      # check if any prereq in this term
-      if any(prereq_id in term["course_ids"] for prereq_id in prereq_ids):
-        continue;
-      
-      # check if any coreq in this term
-      if any(coreq_id in term["course_ids"] for coreq_id in coreq_ids):
-        possible_term_with_coreq = term
-        break
-
-      # can be planned in this term
-      if first_possible_term is None:
-        first_possible_term = term
-    
-    if possible_term_with_coreq is not None:
-      first_possible_term = possible_term_with_coreq
-    
-    if first_possible_term is not None:
-      first_possible_term["course_ids"].append(course["id"])
-      first_possible_term["total_credits"] += course["credits"]
-      plan["total_credits"] += course["credits"]
-      possible_future_courses.extend(course["futureCourses"])
-      planned_courses.append(course["id"])
-      planned = True
-
-    # if not planned, create a new term
-    if not planned:
-      terms.update({
-        f"term_{len(terms) + 1}": Term(
-          id=f"term_{len(terms) + 1}",
-          name=f"Term {len(terms) + 1}",
-          course_ids=[course["id"]],
-          total_credits=course["credits"],
-        )
-      })
-      plan["total_credits"] += course["credits"]
-      possible_future_courses.extend(course["futureCourses"])
-      planned_courses.append(course["id"])
-    
-    if plan["total_credits"] >= target_credits:
-      break
-
-    # add additional complementary courses if not enough credits
-    if len(courses) == 0 and plan["total_credits"] < target_credits and not added_additional_courses:
-      # remove course levels after the level in the last term
-
-      # gather future courses available and filter out by faculty and department
-      results = await coll.aggregate(
-        pipeline=generate_course_id_pipeline(
-          included_ids=possible_future_courses,
-          excluded_ids=planned_courses,
-          faculties=faculties,
-          departments=departments,
-          excluded_levels=[CourseLevel.LEVEL_000, CourseLevel.LEVEL_100],
-          included_levels=course_levels,
-          academic_level=academic_level
-        )
-      )
-      results = await results.to_list()
-      courses = [Course(**c) for c in results]
-      courses = list(filter(lambda c: c["credits"] + plan["total_credits"] <= target_credits, courses))
 
+  # same arguments on the same catalog give the same plan, e.g. retried tool calls
+  client = MongoDBClient.get_instance()
+  catalog = client.course_catalog()
+  version = catalog.version if catalog is not None else None
+  cache = get_plan_cache()
+  key = plan_cache_key(
+    required_course_ids, complementary_course_ids, target_credits, per_term_credits,
+    faculties, departments, course_levels, academic_level
+  )
+  cached = cache.get(key, version)
+  if cached is not None:
+    return "plan", [cached];
+
+  # fetch informations, from the in-memory catalog when loaded
+  fetch_courses = await course_fetcher(client)
+  courses, complementary = await fetch_plan_courses(
+    fetch_courses, course_ids, faculties, departments, course_levels, academic_level
+  )
+  # scheduling is CPU bound, it runs off the event loop (in the plan workers when enabled)
+  plan = await run_scheduling(courses, complementary, course_ids, target_credits, per_term_credits, course_levels, version)
+
+  cache.put(key, plan, version)
   return "plan", [plan];
 
+@tool(response_format="content_and_artifact")
+async def generate_plan_variants(
+  required_course_ids: Annotated[List[CourseId], "course id to be put in the plans"],
+  complementary_course_ids: Annotated[List[CourseId], "course id to be put in the plans as complementary courses"],
+  variants: Annotated[List[PlanVariant], "the parameters of each plan to compare: per_term_credits, target_credits and optionally course_levels of complementary courses"],
+  faculties: Annotated[List[Faculty], "the faculty of the program(s)"],
+  departments: Annotated[List[Department], "the departments to fetch complementary courses from, must includes the same departments as the program(s)"],
+  academic_level: Annotated[AcademicLevel, "the academic level to fetch complementary courses from, must be set to the same academic level as the program(s)"] = AcademicLevel.UGRAD,
+):
+  """
+  Generate several base plans of the same courses to compare them, e.g. 12, 15 and 17 credits per term.
+  Same planning as generate_base_plan, each plan comes with metrics: number of terms, total credits,
+  credits missing to the target and how even the credits are across terms.
+  Use it instead of calling generate_base_plan once per variant.
+  """
+  course_ids = required_course_ids + complementary_course_ids
+  if len(course_ids) == 0 or len(variants) == 0:
+    return "plan_variants", [];
+
+  client = MongoDBClient.get_instance()
+  catalog = client.course_catalog()
+  results = await generate_plan_variants_for(
+    await course_fetcher(client),
+    course_ids,
+    variants,
+    faculties,
+    departments,
+    academic_level,
+    catalog.version if catalog is not None else None
+  )
+
+  return "plan_variants", results;
+
+async def plan_validator(plan: Plan, per_term_credits: float = 15, courses_taken: List[CourseId] = []) -> PlanValidator:
+  """Validator loaded with the courses of a plan, from the in-memory catalog when loaded"""
+  client = MongoDBClient.get_instance()
+  catalog = client.course_catalog()
+  course_ids = plan_course_ids(plan)
+  if len(course_ids) == 0:
+    courses = []
+  elif catalog is not None:
+    courses = catalog.get_many(course_ids)
+  else:
+    courses = await client.find_documents(
+      MongoCollection.Course, generate_course_id_match(course_ids), ProjectionProfile.REQUISITES, limit=len(course_ids)
+    )
+  return PlanValidator(courses, per_term_credits, courses_taken, catalog.version if catalog is not None else None)
+
+@tool(response_format="content_and_artifact")
+async def validate_plan(
+  plan: Annotated[Plan, "the plan to validate, terms in order, as in contexts"],
+  per_term_credits: Annotated[float, "credits cap of each term"] = 15,
+  courses_taken: Annotated[List[CourseId], "courses the user already took, they satisfy requisites"] = [],
+  changed_course_ids: Annotated[List[CourseId], "courses the user moved, added or removed since the previous validation, to only check what they affect. Empty checks the whole plan"] = [],
+  previous_violations: Annotated[Optional[List[PlanViolation]], "violations returned by the previous validate_plan of this plan, before the changes. Required with changed_course_ids, without them the whole plan is checked"] = None,
+):
+  """
+  Check a plan, e.g. after the user moved courses between terms: prerequisites, corequisites,
+  restrictions and the credits cap of each term. Returns the violations with the term and course concerned.
+  Use it instead of reasoning about the validity of a plan yourself.
+  """
+  validator = await plan_validator(plan, per_term_credits, courses_taken)
+  if len(changed_course_ids) > 0 and previous_violations is not None:
+    # only the scope of the changes is checked, the rest of the previous result still holds
+    result = validator.revalidate(plan, previous_violations, changed_course_ids)
+  else:
+    result = validator.validate(plan)
+
+  return "plan validation", [result];
+
 tools: List[BaseTool] = [
   search_program,
   search_course,
   query_mcgill_knowledges,
+  get_course_details,
+  get_program_details,
   update_context,
   ask_user,
-  generate_base_plan
+  generate_base_plan,
+  generate_plan_variants,
+  validate_plan
 ]
\ No newline at end of file
@@ -1,37 +1,19 @@
 from typing import List, Tuple
 from database.types import Requisites
-from database.enums import CourseLevel
 from .types import CreditGroup, CourseId
-import re
+from .requisites import parse_requisites, course_ids, credit_requirements
 
 def parse_req(req: Requisites) -> Tuple[List[CourseId], List[CreditGroup]]:
-  # remove credits requirements from Requisites
-  rest, credits_req = pop_substrings(req['parsed'], r'[0-9]{1,2}-[0-9]{1,}(-[a-zA-Z]{4})+')
-  
-  credits_groups: List[CreditGroup] = []
-  for r in credits_req:
-    items = r.split(sep="-")
-    credits_requirement = items[0]
-    course_levels = [map_course_level(char) for char in items[1]]
-    subject_codes = items[2:]
+  """Flat view of a requisite tree, the course ids and credit groups it mentions"""
+  tree = parse_requisites(req['parsed'])
 
-    credits_groups.append(CreditGroup(
-      credits_requirement=credits_requirement,
-      course_levels=course_levels,
-      subject_codes=subject_codes
-    ))
+  credits_groups: List[CreditGroup] = [
+    CreditGroup(
+      credits_requirement=c.credits,
+      course_levels=list(c.course_levels),
+      subject_codes=list(c.subject_codes)
+    )
+    for c in credit_requirements(tree)
+  ]
 
-  _, course_ids = pop_substrings(rest, r'[^+\|\-\(\)\/]+')
-
-  return course_ids, credits_groups
-  
-def map_course_level(level: str):
-  return CourseLevel["LEVEL_" + level[0].upper() + "00"]
-
-def pop_substrings(source: str, pattern: re.Pattern):
-  matches = re.finditer(pattern, source, flags=re.IGNORECASE | re.MULTILINE)
-  rest = re.sub(pattern, '', source, flags=re.IGNORECASE | re.MULTILINE)
-
-  matches = [m.group().lower().replace(" ", "") for m in matches if m.group().strip() != ""]
-
-  return rest, matches
\ No newline at end of file
+  return sorted(course_ids(tree)), credits_groups
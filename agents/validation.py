@@ -0,0 +1,201 @@
+from typing import Dict, FrozenSet, Iterable, List, Literal, Optional, Set, Tuple
+from typing_extensions import TypedDict
+from database.catalog import course_key
+from database.types import Course
+from .requisites import Requirement, requisite_cache, course_ids, credit_requirements, is_satisfied, format_requirement
+from .types import CourseId, Plan
+
+class PlanViolation(TypedDict):
+  type: Literal["unknown_course", "duplicate_course", "prerequisite", "corequisite", "restriction", "credit_cap"]
+  term_id: str
+  course_id: Optional[CourseId] # None for term level violations
+  message: str
+
+class PlanValidation(TypedDict):
+  valid: bool
+  violations: List[PlanViolation]
+  checked_terms: List[str]
+  checked_courses: int
+
+class PlanValidator:
+  """
+  Checks a plan, e.g. edited by the user, against the requisites of its courses and a per term credit cap.
+  Terms are ordered as in the plan. A prerequisite must be met by taken courses and earlier terms,
+  a corequisite by taken courses, earlier terms or the same term; a restricted course may not appear anywhere.
+
+  Requisite trees come from the requisite cache, so nothing is parsed on repeated validations.
+  With changed course ids only the courses they affect (themselves, every course whose requisites
+  mention them or have a credit group of their subject and level) and the terms holding them are checked,
+  see `revalidate` to merge with earlier results.
+  """
+  def __init__(
+    self,
+    courses: Iterable[Course],
+    per_term_credits: float = 15,
+    taken: Iterable[CourseId] = [],
+    version: Optional[int] = None
+  ):
+    self.per_term_credits = per_term_credits
+    self.taken: Set[str] = { course_key(c) for c in taken }
+    self.courses: Dict[str, Course] = { course_key(c["id"]): c for c in courses }
+    self.credits: Dict[str, float] = { key: c.get("credits", 0) for key, c in self.courses.items() }
+    self.prereqs: Dict[str, Optional[Requirement]] = {}
+    self.coreqs: Dict[str, Optional[Requirement]] = {}
+    self.restrictions: Dict[str, FrozenSet[str]] = {}
+    # course key -> courses whose requisites mention it
+    self.dependents: Dict[str, Set[str]] = {}
+    # (subject, level digit) -> courses with a credit group counting such courses, e.g. ("comp", "3") for 6-3-comp
+    self.credit_dependents: Dict[Tuple[str, str], Set[str]] = {}
+    for key, course in self.courses.items():
+      self.prereqs[key] = requisite_cache.get(course, "prerequisites", version)
+      self.coreqs[key] = requisite_cache.get(course, "corequisites", version)
+      self.restrictions[key] = course_ids(requisite_cache.get(course, "restrictions", version))
+      for other in course_ids(self.prereqs[key]) | course_ids(self.coreqs[key]) | self.restrictions[key]:
+        self.dependents.setdefault(other, set()).add(key)
+      for group in credit_requirements(self.prereqs[key]) + credit_requirements(self.coreqs[key]):
+        for subject in group.subject_codes:
+          for level in group.course_levels:
+            self.credit_dependents.setdefault((subject, level.value[0]), set()).add(key)
+
+  def affected(self, changed_course_ids: Iterable[CourseId]) -> Set[str]:
+    """Course keys whose checks may change with the changed courses, the changed ones included"""
+    changed = { course_key(c) for c in changed_course_ids }
+    keys = set(changed)
+    for c in changed:
+      keys |= self.dependents.get(c, set())
+      keys |= self.credit_dependents.get((c[:4], c[4:5]), set())
+    return keys
+
+  def _check_course(
+    self,
+    key: str,
+    course_id: CourseId,
+    term_id: str,
+    before: Set[str],
+    current: Set[str],
+    planned: Set[str]
+  ) -> List[PlanViolation]:
+    if key not in self.courses:
+      return [PlanViolation(type="unknown_course", term_id=term_id, course_id=course_id, message=f"{course_id} is not in the course catalog")]
+
+    violations: List[PlanViolation] = []
+    prereq = self.prereqs[key]
+    if not is_satisfied(prereq, before, self.credits):
+      violations.append(PlanViolation(
+        type="prerequisite", term_id=term_id, course_id=course_id,
+        message=f"{course_id} requires {format_requirement(prereq)} in an earlier term"
+      ))
+    coreq = self.coreqs[key]
+    if not is_satisfied(coreq, before | current, self.credits):
+      violations.append(PlanViolation(
+        type="corequisite", term_id=term_id, course_id=course_id,
+        message=f"{course_id} requires {format_requirement(coreq)} in the same or an earlier term"
+      ))
+    conflicts = (self.restrictions[key] & (planned | self.taken)) - { key }
+    if conflicts:
+      violations.append(PlanViolation(
+        type="restriction", term_id=term_id, course_id=course_id,
+        message=f"{course_id} can not be taken with {', '.join(sorted(conflicts))}"
+      ))
+    return violations
+
+  def _check_term(self, plan: Plan, term_id: str) -> List[PlanViolation]:
+    term = plan["terms"][term_id]
+    credits = sum(self.credits.get(course_key(c), 0) for c in term.get("course_ids", []))
+    if credits <= self.per_term_credits:
+      return []
+    return [PlanViolation(
+      type="credit_cap", term_id=term_id, course_id=None,
+      message=f"{term.get('name', term_id)} has {credits:g} credits, over the {self.per_term_credits:g} credits cap"
+    )]
+
+  def validate(self, plan: Plan, changed_course_ids: Optional[Iterable[CourseId]] = None, changed_term_ids: Iterable[str] = []) -> PlanValidation:
+    """
+    Every course and term, or only the ones affected by the changed courses (and the changed terms).
+    A scoped result is only valid for that scope, `revalidate` merges it into the plan wide result.
+    """
+    term_ids = list(plan["terms"].keys())
+    # a course planned twice is checked at its first term and reported as a duplicate at the others
+    occurrences: Dict[str, List[int]] = {}
+    written: Dict[str, CourseId] = {}
+    for index, term_id in enumerate(term_ids):
+      for course_id in plan["terms"][term_id].get("course_ids", []):
+        occurrences.setdefault(course_key(course_id), []).append(index)
+        written.setdefault(course_key(course_id), course_id)
+    term_of: Dict[str, int] = { key: indexes[0] for key, indexes in occurrences.items() }
+    planned = set(term_of)
+
+    if changed_course_ids is None:
+      keys = planned
+      terms = set(term_ids)
+    else:
+      changed = { course_key(c) for c in changed_course_ids }
+      keys = self.affected(changed) & planned
+      terms = { term_ids[i] for k in changed for i in occurrences.get(k, []) } | (set(changed_term_ids) & set(term_ids))
+
+    # planned courses before each term, built once per checked term
+    by_term: Dict[int, Set[str]] = {}
+    for key, indexes in occurrences.items():
+      for index in indexes:
+        by_term.setdefault(index, set()).add(key)
+    before_cache: Dict[int, Set[str]] = {}
+    def before(index: int) -> Set[str]:
+      if index not in before_cache:
+        before_cache[index] = self.taken.union(*(by_term.get(i, set()) for i in range(index)))
+      return before_cache[index]
+
+    violations: List[PlanViolation] = []
+    for term_id in term_ids:
+      if term_id in terms:
+        violations.extend(self._check_term(plan, term_id))
+    for key in sorted(keys, key=lambda k: (term_of[k], k)):
+      index = term_of[key]
+      first = plan["terms"][term_ids[index]]
+      for other in dict.fromkeys(occurrences[key][1:]):
+        violations.append(PlanViolation(
+          type="duplicate_course", term_id=term_ids[other], course_id=written[key],
+          message=f"{written[key]} is already planned in {first.get('name', term_ids[index])}"
+        ))
+      violations.extend(self._check_course(
+        key, written[key], term_ids[index], before(index), by_term.get(index, set()), planned
+      ))
+
+    return PlanValidation(
+      valid=len(violations) == 0,
+      violations=violations,
+      checked_terms=[t for t in term_ids if t in terms],
+      checked_courses=len(keys)
+    )
+
+  def revalidate(
+    self,
+    plan: Plan,
+    previous: List[PlanViolation],
+    changed_course_ids: Iterable[CourseId],
+    changed_term_ids: Iterable[str] = []
+  ) -> PlanValidation:
+    """
+    Re-check the scope of a change, e.g. a course moved between terms, and merge with the previous violations.
+    Credit caps are also re-checked on the terms of previous credit cap violations, a course moved out may clear them.
+    """
+    changed_course_ids = list(changed_course_ids)
+    changed_term_ids = set(changed_term_ids) | { v["term_id"] for v in previous if v["type"] == "credit_cap" }
+    result = self.validate(plan, changed_course_ids, changed_term_ids)
+
+    rechecked_courses = self.affected(changed_course_ids)
+    rechecked_terms = set(result["checked_terms"])
+    kept = [
+      v for v in previous
+      if not (v["course_id"] is not None and course_key(v["course_id"]) in rechecked_courses)
+        and not (v["course_id"] is None and v["term_id"] in rechecked_terms)
+    ]
+    violations = kept + result["violations"]
+    return PlanValidation(
+      valid=len(violations) == 0,
+      violations=violations,
+      checked_terms=result["checked_terms"],
+      checked_courses=result["checked_courses"]
+    )
+
+def plan_course_ids(plan: Plan) -> List[CourseId]:
+  return [c for term in plan["terms"].values() for c in term.get("course_ids", [])]
@@ -2,40 +2,97 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from llm.huggingface import get_huggingface_embedding, get_huggingface_llm
+from llm.huggingface import get_huggingface_embedding, aget_huggingface_embedding, get_huggingface_llm
 from database.mongodb import get_mongodb_client, MongoDBClient
 from agents.graph import get_compiled_graph
 from agents.enums import Model
-import logging
+from agents.plan_variants import warm_plan_executor, shutdown_plan_executor
 from database import router as database_router
 from agents import router as agents_router
+from fastapi.responses import JSONResponse
+from contextlib import suppress
+from typing import Any, Awaitable, Callable, Dict
+import logging
+import asyncio
+import time
 import os
 
+info_logger = logging.getLogger("uvicorn.info")
+error_logger = logging.getLogger("uvicorn.error")
+
+async def load_component(components: Dict[str, Dict[str, Any]], name: str, load: Callable[[], Awaitable[Any]]) -> bool:
+    """Run one startup step, recording its state (pending, loading, ready or failed) and load time for /ready"""
+    components[name] = { "state": "loading" }
+    started = time.perf_counter()
+    try:
+        await load()
+        components[name] = { "state": "ready", "load_time": time.perf_counter() - started }
+        info_logger.info(f"{name} ready in {components[name]['load_time']:.2f}s")
+        return True
+    except Exception as e:
+        error_logger.exception(f"Failed to load {name}")
+        components[name] = { "state": "failed", "load_time": time.perf_counter() - started, "error": str(e) }
+        return False
+
+async def load_embedding():
+    # searches arriving before /ready wait for this same load
+    embedding = await aget_huggingface_embedding()
+    # pay the cold inference cost here instead of on the first real query, documents bypass the query cache
+    await embedding.aembed_documents(["warmup"])
+
+async def connect_mongodb():
+    client = get_mongodb_client()
+    await asyncio.to_thread(client.get_client)
+    await client.get_async_client()
+    client.start_health_monitor()
+
+async def startup(components: Dict[str, Dict[str, Any]]):
+    async def database_and_graph():
+        # the graph checkpointer needs the async client
+        if await load_component(components, "mongodb", connect_mongodb):
+            await asyncio.gather(
+                load_component(components, "graph", lambda: get_compiled_graph(Model.OPENAI)),
+                load_component(components, "course_catalog", get_mongodb_client().load_course_catalog)
+            )
+
+    steps = [
+        load_component(components, "embedding", load_embedding),
+        database_and_graph(),
+        load_component(components, "plan_workers", warm_plan_executor)
+    ]
+    if os.getenv("USE_LOCAL_LLM") == "true":
+        steps.append(load_component(components, "local_llm", lambda: asyncio.to_thread(get_huggingface_llm)))
+    await asyncio.gather(*steps)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # initialization
-    # hugginface model init
+    # initialization runs in the background, the server accepts traffic (and answers /ready) immediately
     load_dotenv()
-    get_huggingface_embedding()
+    components: Dict[str, Dict[str, Any]] = { name: { "state": "pending" } for name in ["embedding", "mongodb", "graph", "course_catalog", "plan_workers"] }
     if os.getenv("USE_LOCAL_LLM") == "true":
-        get_huggingface_llm()
-    # initialize database clients
-    # await get_chroma_client().ensure_connection()
-    await get_mongodb_client().ensure_connection()
-    await get_compiled_graph(Model.OPENAI)
+        components["local_llm"] = { "state": "pending" }
+    app.state.components = components
+    startup_task = asyncio.create_task(startup(components))
     yield
     # shutdown
-    embedding = get_huggingface_embedding()
-    if hasattr(embedding, "cleanup"):
-        logging.info(embedding.cleanup())
-    get_huggingface_embedding.cache_clear()
+    startup_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await startup_task
 
-    if os.getenv("USE_LOCAL_LLM") == "true":
+    if get_huggingface_embedding.cache_info().currsize > 0:
+        embedding = get_huggingface_embedding()
+        if hasattr(embedding, "cleanup"):
+            logging.info(embedding.cleanup())
+        get_huggingface_embedding.cache_clear()
+
+    if os.getenv("USE_LOCAL_LLM") == "true" and get_huggingface_llm.cache_info().currsize > 0:
         llm = get_huggingface_llm()
         if hasattr(llm, "cleanup"):
             logging.info(llm.cleanup())
         get_huggingface_llm.cache_clear()
 
+    shutdown_plan_executor()
+
     # await get_chroma_client().close()
     await get_mongodb_client().close()
 
@@ -68,4 +125,12 @@ app.include_router(database_router)
 async def root():
     return {"message": "Hello from DegreeMapper AI!"}
 
-
+@app.get("/ready")
+async def ready():
+    """Readiness probe, 503 until every startup component is loaded and warmed up"""
+    components: Dict[str, Dict[str, Any]] = app.state.components
+    is_ready = all(c["state"] == "ready" for c in components.values())
+    return JSONResponse(
+        status_code=200 if is_ready else 503,
+        content={ "ready": is_ready, "components": components }
+    )
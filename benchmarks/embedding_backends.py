@@ -0,0 +1,77 @@
+"""
+Compare embedding backends against the fp32 model: query latency, resident memory and cosine parity.
+
+    uv run python -m benchmarks.embedding_backends --backends int8 onnx --sample 200
+"""
+from dotenv import load_dotenv
+from llm.huggingface import create_embedding_backend
+from llm.quantized import check_parity
+from llm.enums import EmbeddingBackend
+from llm.profiles import get_encode_profiles
+from database.enums import MongoCollection
+from .utils import sample_texts, latency_summary, rss_mb, print_table, write_json
+import argparse
+import time
+import gc
+import os
+
+QUERIES = [
+    "COMP 250",
+    "comp 206 software systems",
+    "introduction to machine learning",
+    "computer science major",
+    "how many credits can I take per term",
+    "organic chemistry lab",
+]
+
+def measure(backend: EmbeddingBackend, model: str, runs: int):
+    gc.collect()
+    before = rss_mb()
+    started = time.perf_counter()
+    embedding = create_embedding_backend(backend, model, "cpu", get_encode_profiles())
+    load_time = time.perf_counter() - started
+    embedding.embed_query("warmup")
+
+    latencies = []
+    for _ in range(runs):
+        for q in QUERIES:
+            started = time.perf_counter()
+            embedding.embed_query(q)
+            latencies.append(time.perf_counter() - started)
+
+    return embedding, {
+        "backend": backend.value,
+        "load_s": load_time,
+        "rss_delta_mb": rss_mb() - before,
+        **latency_summary(latencies)
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", default=[EmbeddingBackend.INT8.value], choices=[b.value for b in EmbeddingBackend])
+    parser.add_argument("--sample", type=int, default=100, help="catalog documents per collection for the parity check")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--output", default=None, help="optional json output path")
+    args = parser.parse_args()
+
+    load_dotenv()
+    model = os.getenv("EMBEDDING_MODEL") or "BAAI/bge-m3"
+
+    texts = [t for c in MongoCollection for t in sample_texts(c, args.sample)]
+
+    reference, row = measure(EmbeddingBackend.LOCAL, model, args.runs)
+    rows = [row]
+    for b in args.backends:
+        candidate, row = measure(EmbeddingBackend(b), model, args.runs)
+        parity = check_parity(reference, candidate, texts)
+        rows.append({ **row, "cos_mean": parity["mean"], "cos_min": parity["min"], "cos_p5": parity["p5"] })
+        if hasattr(candidate, "cleanup"):
+            candidate.cleanup()
+        del candidate
+
+    print_table(rows)
+    if args.output:
+        write_json(args.output, rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Latency of length-aware encode profiles against a single fixed max_length profile,
+for typical search_course queries and long General collection documents.
+
+    uv run python -m benchmarks.encode_profiles --documents 20 --runs 10
+"""
+from dotenv import load_dotenv
+from sentence_transformers import SentenceTransformer
+from llm.profiles import EncodeProfile, LengthAwareEmbeddings, get_encode_profiles
+from database.enums import MongoCollection
+from .utils import sample_texts, latency_summary, print_table, write_json
+from .embedding_backends import QUERIES
+from typing import List
+import argparse
+import time
+import os
+
+def run(embedding: LengthAwareEmbeddings, texts: List[str], runs: int, batched: bool) -> List[float]:
+    latencies = []
+    for _ in range(runs):
+        if batched:
+            started = time.perf_counter()
+            embedding.embed_documents(texts)
+            latencies.append(time.perf_counter() - started)
+        else:
+            for text in texts:
+                started = time.perf_counter()
+                embedding.embed_query(text)
+                latencies.append(time.perf_counter() - started)
+    return latencies
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--documents", type=int, default=20, help="general documents sampled for the long input case")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--batch_size", type=int, default=16, help="batch size of every profile, so only the max lengths differ")
+    parser.add_argument("--output", default=None, help="optional json output path")
+    args = parser.parse_args()
+
+    load_dotenv()
+    model = SentenceTransformer(os.getenv("EMBEDDING_MODEL") or "BAAI/bge-m3", device=os.getenv("EMBEDDING_DEVICE") or "cpu")
+    documents = sample_texts(MongoCollection.General, args.documents)
+    mixed = QUERIES * 4 + documents[:4]
+
+    # same batch size everywhere, the comparison measures length bucketing and not batching
+    profiles = [EncodeProfile(**{ **p, "batch_size": args.batch_size }) for p in get_encode_profiles()]
+    # previous behaviour: every input encoded with the document max_length
+    fixed: List[EncodeProfile] = [profiles[-1]]
+
+    rows = []
+    for name, p in [("fixed", fixed), ("length_aware", profiles)]:
+        embedding = LengthAwareEmbeddings(model, p)
+        embedding.embed_query("warmup")
+        for case, texts, batched in [
+            ("query", QUERIES, False),
+            ("query_batch", QUERIES * 8, True),
+            ("document_batch", documents, True),
+            ("mixed_batch", mixed, True),
+        ]:
+            rows.append({ "profiles": name, "case": case, **latency_summary(run(embedding, texts, args.runs, batched)) })
+
+    print_table(rows)
+    if args.output:
+        write_json(args.output, rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Bytes carried through the $group stages and latency of the server side fusion pipeline,
+full documents (server) against _id + scores with a final $lookup (slim).
+
+    uv run python -m benchmarks.fusion_pipeline --queries 50 --runs 3
+"""
+from dotenv import load_dotenv
+from llm.huggingface import get_huggingface_embedding
+from database.mongodb import MongoDBClient
+from database.enums import MongoCollection, FusionStrategy
+from .utils import sample_queries, latency_summary, print_table, write_json
+from typing import Any, Dict, List
+import argparse
+import asyncio
+import time
+
+def until_group(pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Prefix of a branch pipeline up to its first $group, which pushes the ranked docs into one array"""
+    end = next(i for i, stage in enumerate(pipeline) if "$group" in stage)
+    return pipeline[:end + 1]
+
+async def grouped_bytes(coll, pipeline: List[Dict[str, Any]]) -> int:
+    response = await coll.aggregate(until_group(pipeline) + [{ "$project": { "bytes": { "$bsonSize": "$$ROOT" } } }])
+    return sum(d["bytes"] for d in await response.to_list())
+
+async def run(n_queries: int, runs: int, n_results: int):
+    client = MongoDBClient.get_instance()
+    ef = get_huggingface_embedding()
+    rows = []
+
+    for collection in MongoCollection:
+        coll = await client.get_async_collection(collection)
+        queries = sample_queries(collection, n_queries)
+
+        for strategy in [FusionStrategy.SERVER, FusionStrategy.SLIM]:
+            vector_bytes = []
+            full_text_bytes = []
+            for q in queries:
+                pipeline = client.build_hybrid_search_pipeline(
+                    q, collection, await ef.aembed_query(q), n_results, slim=strategy == FusionStrategy.SLIM
+                )
+                full_text_pipeline = next(s for s in pipeline if "$unionWith" in s)["$unionWith"]["pipeline"]
+                vector_bytes.append(await grouped_bytes(coll, pipeline))
+                full_text_bytes.append(await grouped_bytes(coll, full_text_pipeline))
+
+            latencies = []
+            for _ in range(runs):
+                for q in queries:
+                    started = time.perf_counter()
+                    await client.hybrid_search(q, collection, n_results, fusion=strategy, cache=False)
+                    latencies.append(time.perf_counter() - started)
+
+            rows.append({
+                "collection": collection.name,
+                "strategy": strategy.value,
+                "vector_group_kb": sum(vector_bytes) / len(vector_bytes) / 1024,
+                "full_text_group_kb": sum(full_text_bytes) / len(full_text_bytes) / 1024,
+                **latency_summary(latencies)
+            })
+
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--n_results", type=int, default=3)
+    parser.add_argument("--output", default=None, help="optional json output path")
+    args = parser.parse_args()
+
+    load_dotenv()
+    rows = asyncio.run(run(args.queries, args.runs, args.n_results))
+    print_table(rows)
+    if args.output:
+        write_json(args.output, rows)
+
+if __name__ == "__main__":
+    main()
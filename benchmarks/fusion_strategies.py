@@ -0,0 +1,60 @@
+"""
+Latency of the server side ($unionWith) and client side (concurrent branches) fusion strategies of hybrid_search,
+and how often both return the same top n documents.
+Queries are embedded once up front to warm the embedding cache, so mostly the search itself is timed.
+
+    uv run python -m benchmarks.fusion_strategies --queries 50 --runs 3
+"""
+from dotenv import load_dotenv
+from llm.huggingface import get_huggingface_embedding
+from database.mongodb import MongoDBClient
+from database.enums import MongoCollection, FusionStrategy
+from .utils import sample_queries, latency_summary, print_table, write_json
+import argparse
+import asyncio
+import time
+
+async def run(n_queries: int, runs: int, n_results: int):
+    client = MongoDBClient.get_instance()
+    ef = get_huggingface_embedding()
+    rows = []
+
+    for collection in MongoCollection:
+        queries = sample_queries(collection, n_queries)
+        for q in queries:
+            await ef.aembed_query(q) # warm the embedding cache
+
+        results = {}
+        for strategy in FusionStrategy:
+            latencies = []
+            for _ in range(runs):
+                for q in queries:
+                    started = time.perf_counter()
+                    docs = await client.hybrid_search(q, collection, n_results, fusion=strategy, cache=False)
+                    latencies.append(time.perf_counter() - started)
+                    results[(strategy, q)] = docs
+
+            rows.append({ "collection": collection.name, "strategy": strategy.value, **latency_summary(latencies) })
+
+        same = sum(results[(FusionStrategy.SERVER, q)] == results[(FusionStrategy.CLIENT, q)] for q in queries)
+        for row in rows[-len(FusionStrategy):]:
+            row["same_results"] = same / max(1, len(queries))
+
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--n_results", type=int, default=3)
+    parser.add_argument("--output", default=None, help="optional json output path")
+    args = parser.parse_args()
+
+    load_dotenv()
+    rows = asyncio.run(run(args.queries, args.runs, args.n_results))
+    print_table(rows)
+    if args.output:
+        write_json(args.output, rows)
+
+if __name__ == "__main__":
+    main()
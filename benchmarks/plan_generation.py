@@ -0,0 +1,231 @@
+"""
+Scaling of generate_base_plan on synthetic course catalogs: wall time, allocations and term counts
+as functions of the number of requested courses, with the catalog held by an in-memory stand-in
+for the course collection (no database needed).
+
+Catalogs are generated with a configurable size, prerequisite density (mean prerequisites per course,
+drawn among lower level courses of the same or related subjects) and credit distribution.
+Complementary expansion follows the futureCourses of the synthetic catalog.
+
+    uv run python -m benchmarks.plan_generation --sizes 10 30 60 120 250 --catalog 5000 --output plans.json
+    uv run python -m benchmarks.plan_generation --baseline plans.json --threshold 0.25
+
+With --baseline, the run exits non zero when the p50 wall time of a size regresses by more than
+--threshold (relative) over the baseline, --max-ms bounds the p50 of every size in absolute terms.
+"""
+from database.catalog import CourseCatalog
+from database.enums import AcademicLevel, Department, Faculty
+from database.types import Course
+from agents.scheduler import build_base_plan
+from agents.types import CourseId
+from agents.requisites import parse_requisites
+from .utils import latency_summary, print_table, write_json
+from typing import Any, Dict, List, Tuple
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+SUBJECTS = ["comp", "math", "ecse", "phys", "chem", "biol", "econ", "psyc", "ling", "phil"]
+LEVELS = [1, 2, 3, 4, 5]
+
+class InMemoryCursor:
+    def __init__(self, docs: List[Dict[str, Any]]):
+        self.docs = docs
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+    async def to_list(self):
+        return list(self.docs)
+
+class InMemoryCourseCollection:
+    """The parts of an AsyncCollection CourseCatalog reads: a full find and its version fingerprint"""
+    def __init__(self, docs: List[Dict[str, Any]]):
+        self.docs = docs
+
+    def find(self, filter: Dict[str, Any] = {}, projection: Dict[str, Any] = {}):
+        fields = [f for f, v in projection.items() if v]
+        return InMemoryCursor([{ "_id": d["_id"], **{ f: d[f] for f in fields if f in d } } for d in self.docs])
+
+    async def aggregate(self, pipeline: List[Dict[str, Any]]):
+        return InMemoryCursor([{ "count": len(self.docs), "updated": None }])
+
+def parse_credits(spec: str) -> Tuple[List[float], List[float]]:
+    """"3:0.8,4:0.15,1:0.05" -> credit values and weights"""
+    pairs = [item.split(":") for item in spec.split(",")]
+    return [float(c) for c, _ in pairs], [float(w) for _, w in pairs]
+
+def synthesize_catalog(size: int, density: float, credits: str, seed: int = 0) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    credit_values, credit_weights = parse_credits(credits)
+    subjects = SUBJECTS + [
+        "x" + "".join(chr(ord("a") + (i // 26 ** k) % 26) for k in range(3))
+        for i in range(max(0, size // 150 - len(SUBJECTS)))
+    ]
+    ids: List[str] = []
+    by_level: Dict[int, List[str]] = { level: [] for level in LEVELS }
+    numbers: Dict[Tuple[str, int], int] = {}
+    for i in range(size):
+        subject = subjects[i % len(subjects)]
+        level = LEVELS[min(len(LEVELS) - 1, int(rng.expovariate(0.9)))]
+        number = numbers.get((subject, level), 0)
+        if number > 99:
+            continue
+        numbers[(subject, level)] = number + 1
+        course_id = f"{subject}{level}{number:02d}"
+        ids.append(course_id)
+        by_level[level].append(course_id)
+
+    docs = []
+    future: Dict[str, List[str]] = { c: [] for c in ids }
+    for n, course_id in enumerate(ids):
+        level = int(course_id[4])
+        lower = [c for l in LEVELS if l < level for c in by_level[l]]
+        prereqs = []
+        if len(lower) > 0:
+            # poisson-like count around the density, mostly the same subject
+            for _ in range(min(len(lower), int(rng.expovariate(1 / density)) if density > 0 else 0)):
+                same = [c for c in lower if c[:4] == course_id[:4]]
+                prereqs.append(rng.choice(same if len(same) > 0 and rng.random() < 0.7 else lower))
+        prereqs = list(dict.fromkeys(prereqs))
+        for p in prereqs:
+            future[p].append(course_id)
+
+        # alternatives become "a | b", the rest are all required
+        parts = []
+        while len(prereqs) > 0:
+            if len(prereqs) >= 2 and rng.random() < 0.3:
+                parts.append(f"({prereqs.pop()} | {prereqs.pop()})")
+            else:
+                parts.append(prereqs.pop())
+        restriction = rng.choice(ids) if rng.random() < 0.02 else ""
+
+        docs.append({
+            "_id": n,
+            "id": course_id,
+            "name": f"Synthetic {course_id}",
+            "credits": rng.choices(credit_values, credit_weights)[0],
+            "faculty": Faculty.SCIENCE.value,
+            "department": Department.COMPUTER_SCIENCE.value,
+            "courseLevel": f"{level}00",
+            "academicLevel": 1 if level < 5 else 0,
+            "prerequisites": { "raw": "", "parsed": " + ".join(parts) },
+            "corequisites": { "raw": "", "parsed": "" },
+            "restrictions": { "raw": "", "parsed": restriction if restriction != course_id else "" },
+            "futureCourses": future[course_id],
+        })
+    return docs
+
+async def load_catalog(docs: List[Dict[str, Any]]) -> CourseCatalog:
+    collection = InMemoryCourseCollection(docs)
+    async def get_collection():
+        return collection
+    catalog = CourseCatalog(get_collection, refresh_interval=0)
+    await catalog.load()
+    return catalog
+
+async def run(catalog: CourseCatalog, sizes: List[int], runs: int, per_term_credits: float, seed: int):
+    rng = random.Random(seed)
+    course_ids = [c["id"] for c in catalog.courses.values()]
+
+    async def fetch_courses(**filter) -> List[Course]:
+        return catalog.scan(**filter)
+
+    async def plan(requested: List[CourseId]):
+        # enough credits to pull in complementary courses from futureCourses
+        target_credits = 3 * len(requested) * 1.5
+        # new version, so the requisite trees are parsed on every run
+        catalog.version += 1
+        parse_requisites.cache_clear()
+        return await build_base_plan(
+            fetch_courses, requested, target_credits, [], [], per_term_credits, [], AcademicLevel.ALL, catalog.version
+        )
+
+    rows = []
+    for size in sizes:
+        samples = [rng.sample(course_ids, min(size, len(course_ids))) for _ in range(runs)]
+        latencies = []
+        terms = []
+        for requested in samples:
+            started = time.perf_counter()
+            result = await plan(requested)
+            latencies.append(time.perf_counter() - started)
+            terms.append(len(result["terms"]))
+
+        # allocations on a separate run, tracing slows everything down
+        tracemalloc.start()
+        await plan(samples[0])
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        rows.append({
+            "courses": size,
+            "terms": sum(terms) / len(terms),
+            **latency_summary(latencies),
+            "peak_alloc_kb": peak / 1024,
+        })
+    return rows
+
+def check_regressions(rows: List[Dict[str, Any]], baseline_path: str, threshold: float, max_ms: float) -> List[str]:
+    failures = []
+    baseline = {}
+    if baseline_path:
+        with open(baseline_path) as f:
+            data = json.load(f)
+        baseline = { r["courses"]: r for r in (data["rows"] if isinstance(data, dict) else data) }
+
+    for row in rows:
+        if max_ms > 0 and row["p50_ms"] > max_ms:
+            failures.append(f"{row['courses']} courses: p50 {row['p50_ms']:.2f}ms over the {max_ms:.2f}ms budget")
+        previous = baseline.get(row["courses"])
+        if previous is not None and row["p50_ms"] > previous["p50_ms"] * (1 + threshold):
+            failures.append(
+                f"{row['courses']} courses: p50 {row['p50_ms']:.2f}ms vs baseline {previous['p50_ms']:.2f}ms (+{threshold:.0%} allowed)"
+            )
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 30, 60, 120, 250])
+    parser.add_argument("--catalog", type=int, default=5000, help="synthetic catalog size")
+    parser.add_argument("--density", type=float, default=1.5, help="mean prerequisites per course")
+    parser.add_argument("--credits", default="3:0.8,4:0.15,1:0.05", help="credit distribution, value:weight pairs")
+    parser.add_argument("--per_term_credits", type=float, default=15)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=None, help="json output of a previous run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative p50 regression over the baseline")
+    parser.add_argument("--max-ms", type=float, default=0, help="absolute p50 budget per size, 0 to disable")
+    parser.add_argument("--output", default=None, help="optional json output path")
+    args = parser.parse_args()
+
+    docs = synthesize_catalog(args.catalog, args.density, args.credits, args.seed)
+
+    async def main_async():
+        catalog = await load_catalog(docs)
+        return await run(catalog, args.sizes, args.runs, args.per_term_credits, args.seed)
+
+    rows = asyncio.run(main_async())
+    print(f"{len(docs)} synthetic courses, {args.density} prerequisites per course on average")
+    print_table(rows)
+    if args.output:
+        write_json(args.output, {
+            "catalog": args.catalog, "density": args.density, "credits": args.credits, "rows": rows
+        })
+
+    failures = check_regressions(rows, args.baseline, args.threshold, args.max_ms)
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    if len(failures) > 0:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Throughput of requisite parsing over the whole course catalog: the legacy flat regex extraction,
+the lark grammar without memoization, and trees memoized by course id and catalog version.
+Also reports the requisite strings the grammar does not cover (they fall back to the flat reading).
+
+    uv run python -m benchmarks.requisite_parser --runs 5
+"""
+from dotenv import load_dotenv
+from lark import LarkError
+from database.mongodb import MongoDBClient
+from database.enums import MongoCollection
+from database.types import Course
+from agents.requisites import RequisiteCache, _parser, _parse_flat, parse_requisites
+from .utils import print_table, write_json
+from typing import Callable, List
+import argparse
+import time
+
+FIELDS = ["prerequisites", "corequisites", "restrictions"]
+
+def load_courses() -> List[Course]:
+    client = MongoDBClient.get_instance()
+    coll = client.get_client()[client.database_name][MongoCollection.Course.value]
+    return [Course(**c) for c in coll.find({}, { "_id": 0, "id": 1, **{ f: 1 for f in FIELDS } })]
+
+def throughput(name: str, strings: int, runs: int, parse_all: Callable[[], None]):
+    elapsed = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        parse_all()
+        elapsed.append(time.perf_counter() - started)
+    best = min(elapsed)
+    return {
+        "mode": name,
+        "strings": strings,
+        "best_ms": 1000 * best,
+        "mean_ms": 1000 * sum(elapsed) / len(elapsed),
+        "strings_per_s": strings / best if best > 0 else 0.0,
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", default=None, help="optional json output path")
+    args = parser.parse_args()
+
+    load_dotenv()
+    courses = load_courses()
+    strings = [
+        (c.get(f) or {}).get("parsed") or ""
+        for c in courses for f in FIELDS
+    ]
+    non_empty = [s for s in strings if s.strip() != ""]
+
+    unsupported = []
+    for s in dict.fromkeys(non_empty):
+        try:
+            _parser.parse(s)
+        except LarkError:
+            unsupported.append(s)
+
+    def grammar():
+        for s in non_empty:
+            try:
+                _parser.parse(s)
+            except LarkError:
+                _parse_flat(s)
+
+    def flat():
+        for s in non_empty:
+            _parse_flat(s)
+
+    cache = RequisiteCache()
+    def memoized():
+        for c in courses:
+            for f in FIELDS:
+                cache.get(c, f, version=1)
+
+    parse_requisites.cache_clear()
+    rows = [
+        throughput("regex flat", len(non_empty), args.runs, flat),
+        throughput("lark grammar", len(non_empty), args.runs, grammar),
+        throughput("memoized by course/version", len(strings), args.runs, memoized),
+    ]
+    print(f"{len(courses)} courses, {len(non_empty)} requisite strings, {len(unsupported)} distinct strings outside the grammar")
+    print_table(rows)
+    for s in unsupported[:20]:
+        print(f"  unsupported: {s!r}")
+
+    if args.output:
+        write_json(args.output, { "rows": rows, "unsupported": unsupported })
+
+if __name__ == "__main__":
+    main()
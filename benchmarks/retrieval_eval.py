@@ -0,0 +1,213 @@
+"""
+Offline retrieval evaluation of hybrid_search: recall@k and MRR over a labelled query set while sweeping
+SEARCH_WEIGHTS, RECIPROCAL_C and numCandidates, plus p50/p95 latency per candidate count and fusion strategy.
+
+The labelled set is json lines, one query per line:
+
+    {"collection": "Course", "query": "intro to programming", "relevant": ["COMP 202"], "field": "id"}
+
+`collection` is a MongoCollection name, `relevant` holds values of `field` (defaults in LABEL_FIELDS).
+Labels are compared normalized, course ids however they are typed ("COMP 202" or "comp202"), other values case insensitive.
+Without --dataset, queries are synthesized from the catalog (document name or first words -> that document).
+
+Branch rankings are fetched once per query and candidate count, fusion is then replayed in python
+with the same formula as the pipeline (reciprocal_rank_fusion), so the weight and constant sweep is free.
+
+    uv run python -m benchmarks.retrieval_eval --dataset queries.jsonl --k 1 3 10 --output eval.json
+"""
+from dotenv import load_dotenv
+from llm.huggingface import get_huggingface_embedding
+from database.mongodb import MongoDBClient
+from database.enums import MongoCollection, MongoIndex, FusionStrategy
+from database.catalog import course_key
+from database.utils import SEARCH_WEIGHTS, RECIPROCAL_C, NUM_CANDIDATES, SEARCH_LIMIT, reciprocal_rank_fusion, generate_vector_search_stages, generate_full_text_search_stage
+from .utils import latency_summary, print_table, write_json
+from typing import Any, List, Tuple
+from typing_extensions import TypedDict
+import argparse
+import asyncio
+import json
+import time
+
+# field identifying a document in the labels of each collection
+LABEL_FIELDS = {
+    MongoCollection.Course: "id",
+    MongoCollection.Program: "url",
+    MongoCollection.General: "id",
+}
+
+WEIGHT_GRID = [(1, 1), (1, 2), (2, 1), (1, 4), (4, 1)]
+RECIPROCAL_C_GRID = [10, 30, 60, 100]
+NUM_CANDIDATES_GRID = [50, 100, 200, 400]
+
+class LabelledQuery(TypedDict):
+    collection: MongoCollection
+    query: str
+    relevant: List[str]
+    field: str
+
+def normalize_label(collection: MongoCollection, field: str, value: Any) -> str:
+    if collection == MongoCollection.Course and field == "id":
+        return course_key(str(value))
+    return str(value).strip().casefold()
+
+def load_dataset(path: str) -> List[LabelledQuery]:
+    queries = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            collection = MongoCollection[entry["collection"]]
+            field = entry.get("field", LABEL_FIELDS[collection])
+            queries.append(LabelledQuery(
+                collection=collection,
+                query=entry["query"],
+                relevant=[normalize_label(collection, field, r) for r in entry["relevant"]],
+                field=field
+            ))
+    return queries
+
+def synthesize_dataset(n: int) -> List[LabelledQuery]:
+    """Known-item queries: the name (or first words of the content) of a sampled document should retrieve it"""
+    client = MongoDBClient.get_instance()
+    db = client.get_client()[client.database_name]
+    queries = []
+    for collection in MongoCollection:
+        field = LABEL_FIELDS[collection]
+        text = "content" if collection == MongoCollection.General else "name"
+        docs = db[collection.value].aggregate([
+            { "$match": { field: { "$exists": True }, text: { "$exists": True } } },
+            { "$sample": { "size": n } },
+            { "$project": { "_id": 0, field: 1, text: 1 } }
+        ])
+        for d in docs:
+            queries.append(LabelledQuery(
+                collection=collection,
+                query=" ".join(str(d[text]).split()[:12]),
+                relevant=[normalize_label(collection, field, d[field])],
+                field=field
+            ))
+    return queries
+
+async def branch_rankings(coll, q: LabelledQuery, vector: List[float], num_candidates: int, limit: int):
+    """
+    Ranked (label, score) lists of the vector and full text branches. Documents without the label field are skipped,
+    they would all share one label and be merged by the fusion.
+    """
+    async def ranked(pipeline, score_field: str) -> List[Tuple[Any, float]]:
+        response = await coll.aggregate(pipeline)
+        return [
+            (normalize_label(q["collection"], q["field"], d[q["field"]]), d[score_field])
+            for d in await response.to_list()
+            if d.get(q["field"]) is not None
+        ]
+
+    started = time.perf_counter()
+    vector_results, full_text_results = await asyncio.gather(
+        ranked([
+            *generate_vector_search_stages(vector, num_candidates=num_candidates, limit=limit),
+            { "$project": { "_id": 0, q["field"]: 1, "vector_search_score": 1 } }
+        ], "vector_search_score"),
+        ranked([
+            generate_full_text_search_stage(q["query"], q["collection"]),
+            { "$limit": limit },
+            { "$project": { "_id": 0, q["field"]: 1, "search_score": { "$meta": "searchScore" } } }
+        ], "search_score")
+    )
+    return vector_results, full_text_results, time.perf_counter() - started
+
+def score(ranking: List[Any], relevant: List[str], k: int) -> Tuple[float, float]:
+    """recall@k and reciprocal rank of the first relevant document within k"""
+    top = ranking[:k]
+    recall = len(set(top) & set(relevant)) / max(1, len(relevant))
+    rr = next((1 / (i + 1) for i, label in enumerate(top) if label in relevant), 0.0)
+    return recall, rr
+
+async def run(queries: List[LabelledQuery], ks: List[int], runs: int):
+    client = MongoDBClient.get_instance()
+    ef = get_huggingface_embedding()
+    quality_rows = []
+    latency_rows = []
+
+    for collection in MongoCollection:
+        subset = [q for q in queries if q["collection"] == collection]
+        if len(subset) == 0:
+            continue
+        coll = await client.get_async_collection(collection)
+        vectors = await ef.aembed_documents([q["query"] for q in subset])
+        current = (SEARCH_WEIGHTS[collection][MongoIndex.VECTOR], SEARCH_WEIGHTS[collection][MongoIndex.FULL_TEXT])
+
+        for num_candidates in NUM_CANDIDATES_GRID:
+            rankings = []
+            latencies = []
+            for q, v in zip(subset, vectors):
+                vector_results, full_text_results, elapsed = await branch_rankings(coll, q, v, num_candidates, SEARCH_LIMIT)
+                rankings.append((vector_results, full_text_results))
+                latencies.append(elapsed)
+            latency_rows.append({
+                "collection": collection.name,
+                "config": f"branches numCandidates={num_candidates}",
+                **latency_summary(latencies)
+            })
+
+            for weights in dict.fromkeys([current, *WEIGHT_GRID]):
+                for c in dict.fromkeys([RECIPROCAL_C, *RECIPROCAL_C_GRID]):
+                    metrics = { f"recall@{k}": 0.0 for k in ks } | { "mrr": 0.0 }
+                    for q, (vector_results, full_text_results) in zip(subset, rankings):
+                        fused = reciprocal_rank_fusion(
+                            [(weights[0], vector_results), (weights[1], full_text_results)],
+                            max(ks),
+                            c
+                        )
+                        labels = [label for label, _ in fused]
+                        for k in ks:
+                            metrics[f"recall@{k}"] += score(labels, q["relevant"], k)[0] / len(subset)
+                        metrics["mrr"] += score(labels, q["relevant"], max(ks))[1] / len(subset)
+
+                    quality_rows.append({
+                        "collection": collection.name,
+                        "num_candidates": num_candidates,
+                        "weights": f"{weights[0]}:{weights[1]}",
+                        "reciprocal_c": c,
+                        "current": weights == current and c == RECIPROCAL_C and num_candidates == NUM_CANDIDATES,
+                        **metrics
+                    })
+
+        # end to end latency of the configured pipeline per fusion strategy
+        for strategy in FusionStrategy:
+            latencies = []
+            for _ in range(runs):
+                for q in subset:
+                    started = time.perf_counter()
+                    await client.hybrid_search(q["query"], collection, max(ks), fusion=strategy, cache=False)
+                    latencies.append(time.perf_counter() - started)
+            latency_rows.append({
+                "collection": collection.name,
+                "config": f"hybrid_search fusion={strategy.value}",
+                **latency_summary(latencies)
+            })
+
+    return quality_rows, latency_rows
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dataset", default=None, help="labelled json lines, synthesized from the catalog if omitted")
+    parser.add_argument("--synthesize", type=int, default=50, help="queries per collection when synthesizing")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 10])
+    parser.add_argument("--runs", type=int, default=1, help="repetitions of the end to end latency runs")
+    parser.add_argument("--output", default=None, help="optional json output path")
+    args = parser.parse_args()
+
+    load_dotenv()
+    queries = load_dataset(args.dataset) if args.dataset else synthesize_dataset(args.synthesize)
+    quality_rows, latency_rows = asyncio.run(run(queries, sorted(args.k), args.runs))
+
+    print_table(quality_rows)
+    print()
+    print_table(latency_rows)
+    if args.output:
+        write_json(args.output, { "quality": quality_rows, "latency": latency_rows })
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Latency/recall trade-off of fixed and adaptive vector search limits.
+Recall is the share of the exact (ENN) top n_results, under the same filter, found by the vector branch.
+
+    uv run python -m benchmarks.search_limits --queries 30 --n_results 3 10 30
+"""
+from dotenv import load_dotenv
+from llm.huggingface import get_huggingface_embedding
+from database.mongodb import MongoDBClient
+from database.enums import MongoCollection, SearchLimitMode, Department, Faculty
+from database.utils import generate_vector_search_stages
+from .utils import sample_queries, latency_summary, print_table, write_json
+from .vector_quantization import search_ids
+from typing import Any, Dict
+import argparse
+import asyncio
+import time
+
+# broad to narrow filters per collection
+FILTERS: Dict[MongoCollection, Dict[str, Dict[str, Any]]] = {
+    MongoCollection.Course: {
+        "none": {},
+        "faculty": { "faculty": [Faculty.SCIENCE.value] },
+        "department": { "department": [Department.COMPUTER_SCIENCE.value] },
+    },
+    MongoCollection.Program: {
+        "none": {},
+        "faculty": { "faculty": [Faculty.ENGINEERING.value] },
+        "department": { "department": [Department.COMPUTER_SCIENCE.value] },
+    },
+    MongoCollection.General: {
+        "none": {},
+    },
+}
+
+async def run(n_queries: int, n_results_list, runs: int):
+    client = MongoDBClient.get_instance()
+    ef = get_huggingface_embedding()
+    rows = []
+
+    for collection in MongoCollection:
+        coll = await client.get_async_collection(collection)
+        queries = sample_queries(collection, n_queries)
+        vectors = [await ef.aembed_query(q) for q in queries]
+
+        for filter_name, filter in FILTERS[collection].items():
+            for n_results in n_results_list:
+                truth = [
+                    await search_ids(coll, generate_vector_search_stages(v, filter, limit=n_results, exact=True))
+                    for v in vectors
+                ]
+
+                for mode in SearchLimitMode:
+                    limits = await client.search_limits(collection, n_results, filter, mode)
+                    recalls = []
+                    for v, expected in zip(vectors, truth):
+                        ids = await search_ids(coll, generate_vector_search_stages(
+                            v,
+                            filter,
+                            num_candidates=limits["num_candidates"],
+                            limit=limits["limit"],
+                            exact=limits["exact"]
+                        ))
+                        recalls.append(len(set(ids) & set(expected)) / max(1, len(expected)))
+
+                    latencies = []
+                    for _ in range(runs):
+                        for q in queries:
+                            started = time.perf_counter()
+                            await client.hybrid_search(q, collection, n_results, filter=filter, limit_mode=mode, cache=False)
+                            latencies.append(time.perf_counter() - started)
+
+                    rows.append({
+                        "collection": collection.name,
+                        "filter": filter_name,
+                        "matching": limits["matching"] if limits["matching"] is not None else await client.count_matching(collection, filter),
+                        "n_results": n_results,
+                        "mode": mode.value,
+                        "num_candidates": "exact" if limits["exact"] else limits["num_candidates"],
+                        "limit": limits["limit"],
+                        "recall": sum(recalls) / len(recalls),
+                        **latency_summary(latencies)
+                    })
+
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=30)
+    parser.add_argument("--n_results", type=int, nargs="+", default=[3, 10, 30])
+    parser.add_argument("--runs", type=int, default=2)
+    parser.add_argument("--output", default=None, help="optional json output path")
+    args = parser.parse_args()
+
+    load_dotenv()
+    rows = asyncio.run(run(args.queries, args.n_results, args.runs))
+    print_table(rows)
+    if args.output:
+        write_json(args.output, rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Latency of N sibling searches issued one by one with hybrid_search against one hybrid_search_many call.
+Search results and query embeddings are uncached for every measured turn.
+
+    uv run python -m benchmarks.search_many --sizes 1 5 10 --runs 5
+"""
+from dotenv import load_dotenv
+from llm.huggingface import get_huggingface_embedding
+from database.mongodb import MongoDBClient
+from database.enums import MongoCollection
+from database.types import SearchRequest
+from .utils import sample_queries, latency_summary, print_table, write_json
+from typing import List
+import argparse
+import asyncio
+import time
+
+def clear_caches(client: MongoDBClient):
+    client.invalidate_search_cache()
+    ef = get_huggingface_embedding()
+    if hasattr(ef, "cache"):
+        ef.cache.clear()
+
+async def run(sizes: List[int], runs: int):
+    client = MongoDBClient.get_instance()
+    await client.hybrid_search("warmup", MongoCollection.Course, cache=False)
+    rows = []
+
+    for size in sizes:
+        sequential = []
+        batched = []
+        for _ in range(runs):
+            requests = [
+                SearchRequest(query=q, collection=MongoCollection.Course, n_results=3)
+                for q in sample_queries(MongoCollection.Course, size)
+            ]
+
+            clear_caches(client)
+            started = time.perf_counter()
+            for r in requests:
+                await client.hybrid_search(**r)
+            sequential.append(time.perf_counter() - started)
+
+            clear_caches(client)
+            started = time.perf_counter()
+            await client.hybrid_search_many(requests)
+            batched.append(time.perf_counter() - started)
+
+        rows.append({ "searches": size, "mode": "sequential", **latency_summary(sequential) })
+        rows.append({ "searches": size, "mode": "hybrid_search_many", **latency_summary(batched) })
+
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", default=None, help="optional json output path")
+    args = parser.parse_args()
+
+    load_dotenv()
+    rows = asyncio.run(run(args.sizes, args.runs))
+    print_table(rows)
+    if args.output:
+        write_json(args.output, rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+from database.mongodb import MongoDBClient
+from database.enums import MongoCollection
+from typing import Any, Dict, List, Sequence
+import numpy as np
+import json
+import os
+
+# fields concatenated into the text that was embedded for each collection
+TEXT_FIELDS = {
+    MongoCollection.Course: ["name", "overview"],
+    MongoCollection.Program: ["name", "overview"],
+    MongoCollection.General: ["content"],
+}
+
+def sample_texts(collection: MongoCollection, n: int) -> List[str]:
+    """Sample n catalog documents of a collection and return their text"""
+    client = MongoDBClient.get_instance()
+    coll = client.get_client()[client.database_name][collection.value]
+    fields = TEXT_FIELDS[collection]
+    docs = coll.aggregate([
+        { "$sample": { "size": n } },
+        { "$project": { "_id": 0, **{ f: 1 for f in fields } } }
+    ])
+
+    return [" ".join(str(d.get(f, "")) for f in fields).strip() for d in docs]
+
+def sample_queries(collection: MongoCollection, n: int) -> List[str]:
+    """Sample short query strings (document names, or the first words of general content)"""
+    client = MongoDBClient.get_instance()
+    coll = client.get_client()[client.database_name][collection.value]
+    field = TEXT_FIELDS[collection][0]
+    docs = coll.aggregate([
+        { "$sample": { "size": n } },
+        { "$project": { "_id": 0, field: 1 } }
+    ])
+
+    return [" ".join(str(d.get(field, "")).split()[:12]) for d in docs]
+
+def percentile(values: Sequence[float], q: float) -> float:
+    return float(np.percentile(values, q)) if len(values) > 0 else 0.0
+
+def latency_summary(seconds: Sequence[float]) -> Dict[str, float]:
+    """p50/p95/p99 and mean latency in milliseconds"""
+    ms = [1000 * s for s in seconds]
+    return {
+        "p50_ms": percentile(ms, 50),
+        "p95_ms": percentile(ms, 95),
+        "p99_ms": percentile(ms, 99),
+        "mean_ms": float(np.mean(ms)) if len(ms) > 0 else 0.0,
+    }
+
+def rss_mb() -> float:
+    """Resident memory of the current process in MB (linux only)"""
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+def print_table(rows: List[Dict[str, Any]]):
+    if len(rows) == 0:
+        return
+    columns = list(rows[0].keys())
+    cells = [[f"{r.get(c, ''):.3f}" if isinstance(r.get(c), float) else str(r.get(c, "")) for c in columns] for r in rows]
+    widths = [max(len(c), *(len(row[i]) for row in cells)) for i, c in enumerate(columns)]
+
+    print(" | ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    print("-+-".join("-" * w for w in widths))
+    for row in cells:
+        print(" | ".join(v.ljust(w) for v, w in zip(row, widths)))
+
+def write_json(path: str, data: Any):
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2, default=str)
@@ -0,0 +1,79 @@
+"""
+Recall and latency of the quantized vector search modes against exact (ENN) float32 search.
+Requires the quantized fields written by `python -m database.quantization` and indexed in vector_index.
+
+    uv run python -m benchmarks.vector_quantization --queries 50 --k 10
+"""
+from dotenv import load_dotenv
+from llm.huggingface import get_huggingface_embedding
+from database.mongodb import MongoDBClient
+from database.enums import MongoCollection, VectorQuantization
+from database.quantization import quantize_vector
+from database.utils import generate_vector_search_stages
+from .utils import sample_queries, latency_summary, print_table, write_json
+from typing import List
+import argparse
+import asyncio
+import time
+
+async def search_ids(coll, stages) -> List:
+    response = await coll.aggregate(stages + [{ "$project": { "_id": 1 } }])
+    return [d["_id"] for d in await response.to_list()]
+
+async def run(n_queries: int, k: int):
+    client = MongoDBClient.get_instance()
+    ef = get_huggingface_embedding()
+    rows = []
+
+    for collection in MongoCollection:
+        coll = await client.get_async_collection(collection)
+        queries = sample_queries(collection, n_queries)
+        vectors = [await ef.aembed_query(q) for q in queries]
+
+        # exact nearest neighbours as ground truth
+        truth = [
+            await search_ids(coll, [{
+                "$vectorSearch": {
+                    "index": "vector_index",
+                    "path": "embeddings",
+                    "queryVector": quantize_vector(v, VectorQuantization.FLOAT32),
+                    "exact": True,
+                    "limit": k
+                }
+            }])
+            for v in vectors
+        ]
+
+        for mode in VectorQuantization:
+            latencies = []
+            recalls = []
+            for v, expected in zip(vectors, truth):
+                started = time.perf_counter()
+                ids = await search_ids(coll, generate_vector_search_stages(v, quantization=mode, limit=k))
+                latencies.append(time.perf_counter() - started)
+                recalls.append(len(set(ids[:k]) & set(expected)) / max(1, len(expected)))
+
+            rows.append({
+                "collection": collection.name,
+                "mode": mode.value,
+                f"recall@{k}": sum(recalls) / len(recalls),
+                **latency_summary(latencies)
+            })
+
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--output", default=None, help="optional json output path")
+    args = parser.parse_args()
+
+    load_dotenv()
+    rows = asyncio.run(run(args.queries, args.k))
+    print_table(rows)
+    if args.output:
+        write_json(args.output, rows)
+
+if __name__ == "__main__":
+    main()
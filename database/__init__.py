@@ -1,8 +1,10 @@
 from fastapi import APIRouter
 from .mongodb import  get_async_mongodb_client, MongoDBClient
-from .enums import MongoCollection, Department, AcademicLevel
+from .enums import MongoCollection, Department, AcademicLevel, FusionStrategy
 from agents.tools import search_course, search_program, query_mcgill_knowledges
+from agents.plan_cache import get_plan_cache
 from langchain_core.messages import ToolMessage
+from typing import Optional
 
 router = APIRouter()
 
@@ -11,6 +13,52 @@ async def ping_mongodb():
     client = MongoDBClient.get_instance()
     return await client.ensure_connection()
 
+@router.get("/health/mongodb")
+async def mongodb_health():
+    client = MongoDBClient.get_instance()
+    return client.health_stats()
+
+@router.get("/profile/search")
+async def profile_search(collection: MongoCollection, query: str, n_results: int = 3, fusion: Optional[FusionStrategy] = None):
+    """Timings of each step of one hybrid_search and the explained aggregation, per stage"""
+    client = MongoDBClient.get_instance()
+    return await client.hybrid_search(query, collection, n_results, fusion=fusion, profile=True)
+
+@router.get("/cache/search")
+async def search_cache_stats():
+    client = MongoDBClient.get_instance()
+    return client.search_cache_stats()
+
+@router.delete("/cache/search")
+async def invalidate_search_cache(collection: Optional[MongoCollection] = None):
+    client = MongoDBClient.get_instance()
+    client.invalidate_search_cache(collection)
+    return client.search_cache_stats()
+
+@router.get("/cache/plans")
+async def plan_cache_stats():
+    return get_plan_cache().stats()
+
+@router.delete("/cache/plans")
+async def invalidate_plan_cache():
+    cache = get_plan_cache()
+    cache.invalidate()
+    return cache.stats()
+
+@router.get("/catalog/courses")
+async def course_catalog_stats():
+    client = MongoDBClient.get_instance()
+    return client.course_catalog_stats()
+
+@router.post("/catalog/courses/refresh")
+async def refresh_course_catalog():
+    """Reload the course catalog snapshot if the collection changed"""
+    client = MongoDBClient.get_instance()
+    catalog = client.course_catalog()
+    if catalog is not None:
+        await catalog.check_version()
+    return client.course_catalog_stats()
+
 @router.get("/query/tools/{tool_name}")
 async def test_tool(tool_name: str, query: str, n_results: int = 3):
 
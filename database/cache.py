@@ -0,0 +1,107 @@
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from llm.cache import normalize_query
+from .enums import MongoCollection, FusionStrategy, SearchLimitMode
+import bson
+import json
+import threading
+import time
+
+SearchCacheKey = Tuple[str, str, str, str, int, str, str]
+
+def search_cache_key(
+        collection: MongoCollection,
+        query: str,
+        n_results: int,
+        filter: Dict[str, Any],
+        proj: Dict[str, Any],
+        fusion: FusionStrategy,
+        limit_mode: SearchLimitMode
+    ) -> SearchCacheKey:
+    """
+    Canonical key, filters and projections that only differ in key order share one entry.
+    Fusion strategy and limit mode change the results, they are passed resolved (defaults applied).
+    """
+    return (
+        collection.value,
+        normalize_query(query),
+        json.dumps(filter, sort_keys=True, default=str),
+        json.dumps(proj, sort_keys=True, default=str),
+        n_results,
+        fusion.value,
+        limit_mode.value
+    )
+
+class SearchResultCache:
+    """
+    LRU cache with TTL for hybrid_search results, bounded by the encoded size of the cached documents.
+    Results are kept BSON encoded, every hit decodes fresh dicts so callers can not mutate a cached entry.
+    """
+    def __init__(self, max_bytes: int = 64 * 2**20, ttl: float = 86400):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes = 0
+        self._entries: OrderedDict[SearchCacheKey, Tuple[float, int, List[bytes]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: SearchCacheKey) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            entry = self._entries.get(key, None)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl:
+                self._remove(key)
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            encoded = entry[2]
+
+        return [bson.decode(doc) for doc in encoded]
+
+    def put(self, key: SearchCacheKey, results: List[Dict[str, Any]]):
+        if self.max_bytes <= 0:
+            return
+        encoded = [bson.encode(doc) for doc in results]
+        size = sum(len(doc) for doc in encoded)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic(), size, encoded)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, collection: Optional[MongoCollection] = None):
+        """Drop the entries of one collection, or every entry"""
+        with self._lock:
+            keys = [k for k in self._entries if collection is None or k[0] == collection.value]
+            for key in keys:
+                self._remove(key)
+
+    def _remove(self, key: SearchCacheKey):
+        _, size, _ = self._entries.pop(key)
+        self.bytes -= size
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total > 0 else 0.0
+            }
@@ -0,0 +1,260 @@
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.errors import OperationFailure
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from .enums import AcademicLevel, CourseLevel, Department, Faculty
+from .types import Course
+import asyncio
+import logging
+import re
+import sys
+import time
+
+info_logger = logging.getLogger("uvicorn.info")
+error_logger = logging.getLogger("uvicorn.error")
+
+# "The $changeStream stage is only supported on replica sets", e.g. a standalone mongod
+CHANGE_STREAMS_UNSUPPORTED = 40573
+
+# fields plan generation needs, the rest of a course stays in the database
+CATALOG_FIELDS = [
+    "id", "name", "credits", "faculty", "department", "academicLevel", "courseLevel", "terms",
+    "prerequisites", "corequisites", "restrictions", "futureCourses", "notes"
+]
+
+# secondary indexes, field of the course -> value -> keys
+INDEXED_FIELDS = ["department", "faculty", "courseLevel", "academicLevel"]
+
+def course_key(course_id: str) -> str:
+    """Hash key of a course id however it is typed, "COMP 250", "comp250" and "Comp-250" share one key"""
+    return re.sub(r"[\s-]+", "", course_id).lower()
+
+def _compact(doc: Dict[str, Any]) -> Course:
+    course = Course(**{ field: doc[field] for field in CATALOG_FIELDS if field in doc })
+    # repeated strings of thousands of courses point to one object
+    for field in ["faculty", "department", "courseLevel"]:
+        if isinstance(course.get(field), str):
+            course[field] = sys.intern(course[field])
+    return course
+
+class CourseCatalog:
+    """
+    In-process snapshot of the course collection with a hash index on the course id and
+    secondary indexes on department, faculty, courseLevel and academicLevel.
+
+    Kept current by a change stream, or by a periodic version check (document count and last updatedAt)
+    where change streams are unavailable. `version` increases with every applied change, so caches
+    derived from the catalog can key on it.
+    """
+    def __init__(
+            self,
+            get_collection: Callable[[], Awaitable[AsyncCollection]],
+            refresh_interval: float = 300 # seconds between version checks, 0 to disable refreshing
+        ):
+        self.get_collection = get_collection
+        self.refresh_interval = refresh_interval
+
+        self.courses: Dict[str, Course] = {}
+        self.indexes: Dict[str, Dict[Any, Set[str]]] = { field: {} for field in INDEXED_FIELDS }
+        self._keys_by_object_id: Dict[Any, str] = {}
+        self.version = 0
+        self.loaded_at: Optional[float] = None
+        self.load_time: Optional[float] = None
+        self.refresh_mode: Optional[str] = None # change_stream or polling
+        self._fingerprint: Optional[Tuple[int, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.loaded_at is not None
+
+    def _add(self, object_id: Any, doc: Dict[str, Any]):
+        if "id" not in doc:
+            return
+        self._remove(object_id)
+        key = course_key(doc["id"])
+        course = _compact(doc)
+        self.courses[key] = course
+        self._keys_by_object_id[object_id] = key
+        for field in INDEXED_FIELDS:
+            if field in course:
+                self.indexes[field].setdefault(course[field], set()).add(key)
+
+    def _remove(self, object_id: Any):
+        key = self._keys_by_object_id.pop(object_id, None)
+        course = self.courses.pop(key, None) if key is not None else None
+        if course is None:
+            return
+        for field in INDEXED_FIELDS:
+            keys = self.indexes[field].get(course.get(field))
+            if keys is not None:
+                keys.discard(key)
+
+    async def _read_fingerprint(self, coll: AsyncCollection) -> Tuple[int, Any]:
+        response = await coll.aggregate([
+            { "$group": { "_id": None, "count": { "$sum": 1 }, "updated": { "$max": "$updatedAt" } } }
+        ])
+        stats = await response.to_list()
+        if len(stats) == 0:
+            return (0, None)
+        return (stats[0]["count"], stats[0]["updated"])
+
+    async def load(self):
+        """Full (re)load of the snapshot"""
+        started = time.perf_counter()
+        coll = await self.get_collection()
+        fingerprint = await self._read_fingerprint(coll)
+        cursor = coll.find({}, { field: 1 for field in CATALOG_FIELDS })
+
+        previous = (self.courses, self.indexes, self._keys_by_object_id)
+        self.courses = {}
+        self.indexes = { field: {} for field in INDEXED_FIELDS }
+        self._keys_by_object_id = {}
+        try:
+            async for doc in cursor:
+                self._add(doc["_id"], doc)
+        except BaseException:
+            # a failed reload keeps serving the previous snapshot
+            self.courses, self.indexes, self._keys_by_object_id = previous
+            raise
+
+        self._fingerprint = fingerprint
+        self.version += 1
+        self.loaded_at = time.time()
+        self.load_time = time.perf_counter() - started
+        info_logger.info(f"Course catalog loaded {len(self.courses)} courses in {self.load_time:.2f}s (version {self.version})")
+
+    async def _watch(self, coll: AsyncCollection):
+        """Apply changes as they happen, returns when the stream is invalidated"""
+        async with await coll.watch(full_document="updateLookup") as stream:
+            self.refresh_mode = "change_stream"
+            # changes between the load and the stream opening would be missed otherwise
+            if await self._read_fingerprint(coll) != self._fingerprint:
+                await self.load()
+            async for change in stream:
+                operation = change["operationType"]
+                object_id = change.get("documentKey", {}).get("_id")
+                if operation in ("insert", "update", "replace") and change.get("fullDocument") is not None:
+                    self._add(object_id, change["fullDocument"])
+                elif operation == "delete":
+                    self._remove(object_id)
+                elif operation in ("drop", "rename", "dropDatabase", "invalidate"):
+                    await self.load()
+                    return
+                else:
+                    continue
+                self.version += 1
+
+    async def check_version(self) -> bool:
+        """Reload if the collection changed since the snapshot, True if it did"""
+        coll = await self.get_collection()
+        if await self._read_fingerprint(coll) == self._fingerprint:
+            return False
+        await self.load()
+        return True
+
+    async def _poll(self):
+        self.refresh_mode = "polling"
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.check_version()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error_logger.error(f"Course catalog version check failed: {e}")
+
+    async def _run(self):
+        """Follow the change stream, reopened with backoff after errors, polling only where change streams are unsupported"""
+        backoff = 1.0
+        while True:
+            try:
+                coll = await self.get_collection()
+                await self._watch(coll)
+                backoff = 1.0
+                continue
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code == CHANGE_STREAMS_UNSUPPORTED:
+                    info_logger.info(f"Course catalog change stream unavailable, checking versions every {self.refresh_interval}s: {e}")
+                    break
+                error_logger.error(f"Course catalog change stream failed, reopening in {backoff:.0f}s: {e}")
+            except Exception as e:
+                # transient network errors, failed resumes or reloads, changes missed meanwhile are caught up on reopening
+                error_logger.error(f"Course catalog change stream failed, reopening in {backoff:.0f}s: {e}")
+            await asyncio.sleep(backoff)
+            backoff = min(max(1.0, self.refresh_interval), backoff * 2)
+        await self._poll()
+
+    def start(self):
+        """Keep the snapshot current in the background, no-op if already running or disabled"""
+        if self.refresh_interval <= 0:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get(self, course_id: str) -> Optional[Course]:
+        return self.courses.get(course_key(course_id))
+
+    def get_many(self, course_ids: Iterable[str]) -> List[Course]:
+        """Courses found among the given ids, duplicates removed, in the given order"""
+        keys = dict.fromkeys(course_key(c) for c in course_ids)
+        return [self.courses[key] for key in keys if key in self.courses]
+
+    def scan(
+            self,
+            included_ids: Optional[Iterable[str]] = None, # None scans the whole catalog
+            excluded_ids: Iterable[str] = [],
+            faculties: List[Faculty] = [],
+            departments: List[Department] = [],
+            excluded_levels: List[CourseLevel] = [],
+            included_levels: List[CourseLevel] = [],
+            academic_level: AcademicLevel = AcademicLevel.UGRAD
+        ) -> List[Course]:
+        """In memory equivalent of generate_course_id_pipeline, sorted by course number"""
+        def union(field: str, values: Iterable[Any]) -> Set[str]:
+            keys: Set[str] = set()
+            for value in values:
+                keys |= self.indexes[field].get(value, set())
+            return keys
+
+        candidates = [
+            union("academicLevel", [0] if academic_level == AcademicLevel.ALL else [0, 1 if academic_level == AcademicLevel.UGRAD else 2])
+        ]
+        if included_ids is not None:
+            candidates.append({ course_key(c) for c in included_ids } & self.courses.keys())
+        if len(faculties) > 0:
+            candidates.append(union("faculty", [f.value for f in faculties]))
+        if len(departments) > 0:
+            candidates.append(union("department", [d.value for d in departments]))
+        if len(included_levels) > 0:
+            candidates.append(union("courseLevel", [l.value for l in included_levels]))
+
+        # intersect from the most selective index
+        candidates.sort(key=len)
+        keys = set.intersection(*candidates)
+        keys -= { course_key(c) for c in excluded_ids }
+        if len(excluded_levels) > 0:
+            keys -= union("courseLevel", [l.value for l in excluded_levels])
+
+        return sorted((self.courses[key] for key in keys), key=lambda c: c["id"][4:])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "courses": len(self.courses),
+            "version": self.version,
+            "loaded_at": self.loaded_at,
+            "load_time": self.load_time,
+            "refresh_mode": self.refresh_mode,
+            "refresh_interval": self.refresh_interval
+        }
@@ -353,4 +353,32 @@ class Department(Enum):
     HEALTH_SCIENCES_EDUCATION = "Health Sciences Education"
     GRAD_POSTDOC_STUDIES_DEAN = "Grad & Postdoc Studies (Dean)"
     INSTITUTE_STUDY_CANADA = "Institute for Study of Canada"
-    OPHTHALMOLOGY = "Ophthalmology"
\ No newline at end of file
+    OPHTHALMOLOGY = "Ophthalmology"
+
+class VectorQuantization(Enum):
+    FLOAT32 = "float32" # search the full precision embeddings field
+    INT8 = "int8" # scalar quantized copy, rescored with full precision
+    BINARY = "binary" # packed sign bits, rescored with full precision
+
+class SearchEngine(Enum):
+    ATLAS = "atlas" # $vectorSearch + $search aggregation on Atlas
+    LOCAL = "local" # in-process vector matrix + BM25 index, works against a plain mongod
+
+class FusionStrategy(Enum):
+    SERVER = "server" # one aggregation, branches fused with $unionWith + $group
+    SLIM = "slim" # same aggregation fused on _id + scores only, final documents looked up by _id
+    CLIENT = "client" # branches run concurrently for _id + score, fused in python
+
+class SearchLimitMode(Enum):
+    FIXED = "fixed" # numCandidates 100, limit 20 whatever the request
+    ADAPTIVE = "adaptive" # sized from n_results and the number of documents matching the filter
+
+class CircuitState(Enum):
+    CLOSED = "closed" # healthy, requests go through
+    OPEN = "open" # unhealthy, requests fail fast until the backoff elapses
+    HALF_OPEN = "half_open" # backoff elapsed, the next outcome closes or reopens the circuit
+
+class ProjectionProfile(Enum):
+    CARD = "card" # identifying fields and a short overview
+    REQUISITES = "requisites" # identifying fields and requirements (course requisites, program sections)
+    FULL = "full" # whole document
@@ -0,0 +1,145 @@
+from pymongo.errors import ConnectionFailure
+from typing import Any, Awaitable, Callable, Dict, Optional
+from .enums import CircuitState
+import asyncio
+import logging
+import time
+
+info_logger = logging.getLogger("uvicorn.info")
+error_logger = logging.getLogger("uvicorn.error")
+
+class CircuitOpenError(ConnectionFailure):
+    """A request rejected by the open circuit, not a failure of the connection itself"""
+
+class ConnectionMonitor:
+    """
+    Background health check with a circuit breaker, so requests only read an in-memory state.
+
+    closed: requests go through, `failure_threshold` consecutive failures (checks or requests) open the circuit
+    open: requests fail fast, the monitor reconnects in the background with exponential backoff
+    half_open: backoff elapsed, requests go through again, the next success (request or check) closes and the next failure reopens
+
+    Reconnecting only happens while open, when no request is let through, never under half open trial requests.
+    """
+    def __init__(
+            self,
+            check: Callable[[], Awaitable[Any]],
+            reconnect: Callable[[], Awaitable[Any]],
+            interval: float = 10,
+            timeout: float = 5,
+            failure_threshold: int = 3,
+            initial_backoff: float = 1,
+            max_backoff: float = 60
+        ):
+        self.check = check
+        self.reconnect = reconnect
+        self.interval = interval
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self.backoff = initial_backoff
+        self.retry_at = 0.0
+        self.last_check: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.rejected = 0
+        self.reconnecting = False
+        self._task: Optional[asyncio.Task] = None
+
+    def allow_request(self) -> bool:
+        """Hot path, no I/O"""
+        if self.state == CircuitState.OPEN:
+            if self.reconnecting or time.monotonic() < self.retry_at:
+                self.rejected += 1
+                return False
+            self.state = CircuitState.HALF_OPEN
+        return True
+
+    def retry_in(self) -> float:
+        return max(0.0, self.retry_at - time.monotonic())
+
+    def record_success(self):
+        if self.state != CircuitState.CLOSED:
+            info_logger.info("Connection recovered, closing circuit")
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self.backoff = self.initial_backoff
+        self.last_error = None
+
+    def record_failure(self, error: BaseException):
+        self.failures += 1
+        self.last_error = repr(error)
+        if self.state == CircuitState.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != CircuitState.OPEN:
+                error_logger.error(f"Connection unhealthy, opening circuit for {self.backoff:.1f}s: {self.last_error}")
+            self.state = CircuitState.OPEN
+            self.retry_at = time.monotonic() + self.backoff
+            self.backoff = min(self.max_backoff, self.backoff * 2)
+
+    async def reopen(self):
+        """
+        Reconnect while the circuit is open, the next probe or trial request tells if it worked.
+        The circuit stays open until the reconnect returns, even past the backoff.
+        """
+        self.reconnecting = True
+        try:
+            await asyncio.wait_for(self.reconnect(), self.timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.last_error = repr(e)
+            error_logger.error(f"Reconnect failed: {self.last_error}")
+        finally:
+            self.reconnecting = False
+
+    async def probe(self) -> bool:
+        """One health check, a success closes the circuit whatever its state"""
+        try:
+            await asyncio.wait_for(self.check(), self.timeout)
+            self.record_success()
+            return True
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.record_failure(e)
+            return False
+        finally:
+            self.last_check = time.time()
+
+    async def _run(self):
+        while True:
+            if self.state == CircuitState.OPEN:
+                await self.reopen()
+                await asyncio.sleep(self.retry_in())
+            else:
+                await asyncio.sleep(self.interval)
+            await self.probe()
+
+    def start(self):
+        """Start the monitor on the running loop, no-op if it is already running"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state.value,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "retry_in": self.retry_in() if self.state == CircuitState.OPEN else 0.0,
+            "last_check": self.last_check,
+            "last_error": self.last_error,
+            "reconnecting": self.reconnecting,
+            "interval": self.interval
+        }
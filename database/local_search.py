@@ -0,0 +1,255 @@
+"""
+In-process hybrid search, a drop-in for the Atlas `$vectorSearch` + `$search` pipeline of `hybrid_search`.
+
+Each collection is loaded once into a memory-mapped float32 embedding matrix, a BM25 inverted index over
+the fields used by `generate_search_stage`, and per-value filter masks. Ranking and reciprocal rank fusion
+run in numpy, only the final n documents are fetched from mongo, with stages a plain mongod supports.
+Enable with SEARCH_ENGINE=local.
+"""
+from pymongo.asynchronous.collection import AsyncCollection
+from typing import Any, Dict, List, Optional, Tuple
+from llm.cache import normalize_query
+from .enums import MongoCollection, MongoIndex
+from .quantization import to_numpy
+from .utils import RESULT_EXCLUDED_FIELDS, reciprocal_rank_fusion
+import numpy as np
+import asyncio
+import hashlib
+import logging
+import tempfile
+import math
+import re
+import os
+
+info_logger = logging.getLogger("uvicorn.info")
+
+# fields searched by generate_search_stage for each collection
+TEXT_FIELDS = {
+    MongoCollection.Course: ["id", "name"],
+    MongoCollection.Program: ["name"],
+    MongoCollection.General: ["content"],
+}
+
+# fields the search tools filter on
+FILTER_FIELDS = ["level", "faculty", "department", "degree", "academicLevel", "courseLevel", "credits"]
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+def tokenize(text: str) -> List[str]:
+    # "COMP 250" and "comp250" both become the token of the course id
+    return TOKEN_PATTERN.findall(normalize_query(text))
+
+class LocalSearchIndex:
+    """Vector matrix, BM25 index and filter masks of one collection"""
+    def __init__(
+            self,
+            ids: List[Any],
+            vectors: np.ndarray,
+            texts: List[str],
+            filter_values: Dict[str, List[Any]]
+        ):
+        self.ids = ids
+        self.vectors = vectors
+
+        # filter field -> value -> documents holding it (any element for list fields), a filter is a few vectorized ors
+        n = len(ids)
+        self.value_masks: Dict[str, Dict[Any, np.ndarray]] = {}
+        for field, values in filter_values.items():
+            masks: Dict[Any, np.ndarray] = {}
+            for i, value in enumerate(values):
+                for v in (value if isinstance(value, list) else [value]):
+                    if v is not None:
+                        masks.setdefault(v, np.zeros(n, dtype=bool))[i] = True
+            self.value_masks[field] = masks
+        self.credits = np.array(
+            [x if isinstance(x, (int, float)) else np.nan for x in filter_values.get("credits", [None] * n)],
+            dtype=np.float64
+        )
+
+        # BM25 postings: term -> (document indices, term frequencies)
+        postings: Dict[str, Dict[int, int]] = {}
+        lengths = np.zeros(len(texts), dtype=np.float32)
+        for i, text in enumerate(texts):
+            tokens = tokenize(text)
+            lengths[i] = len(tokens)
+            for token in tokens:
+                frequencies = postings.setdefault(token, {})
+                frequencies[i] = frequencies.get(i, 0) + 1
+
+        self.lengths = lengths
+        self.avg_length = float(lengths.mean()) if len(texts) > 0 else 0.0
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {
+            term: (np.fromiter(f.keys(), dtype=np.int32), np.fromiter(f.values(), dtype=np.float32))
+            for term, f in postings.items()
+        }
+
+    def filter_mask(self, filters: Dict[str, Any], vector: bool) -> np.ndarray:
+        """Same semantics as generate_vector_search_filter (vector=True) and generate_search_filter"""
+        mask = np.ones(len(self.ids), dtype=bool)
+        for k, v in filters.items():
+            if isinstance(v, list) and len(v) == 0:
+                continue
+            if vector and k == "course_level":
+                continue
+            if k == "credits" and isinstance(v, float):
+                mask &= self.credits <= v # nan, i.e. missing credits, never matches
+            else:
+                masks = self.value_masks.get(k, {})
+                allowed = np.zeros(len(self.ids), dtype=bool)
+                for value in (v if isinstance(v, list) else [v]):
+                    if value in masks:
+                        allowed |= masks[value]
+                mask &= allowed
+        return mask
+
+    def vector_search(self, query_vector: List[float], mask: np.ndarray, limit: int) -> List[Tuple[int, float]]:
+        candidates = np.flatnonzero(mask)
+        if len(candidates) == 0:
+            return []
+        # same scale as vectorSearchScore with dotProduct similarity
+        scores = (1 + self.vectors[candidates] @ np.asarray(query_vector, dtype=np.float32)) / 2
+        return self._top(candidates, scores, limit)
+
+    def text_search(self, query: str, mask: np.ndarray, limit: int) -> List[Tuple[int, float]]:
+        n = len(self.ids)
+        scores = np.zeros(n, dtype=np.float32)
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            docs, tf = self.postings[term]
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[docs] / max(self.avg_length, 1e-6))
+            scores[docs] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        candidates = np.flatnonzero(mask & (scores > 0))
+        return self._top(candidates, scores[candidates], limit)
+
+    @staticmethod
+    def _top(candidates: np.ndarray, scores: np.ndarray, limit: int) -> List[Tuple[int, float]]:
+        if len(candidates) > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+        else:
+            top = np.arange(len(candidates))
+        top = top[np.lexsort((candidates[top], -scores[top]))] # ties broken by document order
+        return [(int(candidates[i]), float(scores[i])) for i in top]
+
+class LocalSearchEngine:
+    """Lazily loaded LocalSearchIndex per collection"""
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.cache_dir = cache_dir
+        self._indexes: Dict[MongoCollection, LocalSearchIndex] = {}
+        self._locks: Dict[MongoCollection, asyncio.Lock] = {}
+
+    async def get_index(self, collection: MongoCollection, coll: AsyncCollection) -> LocalSearchIndex:
+        if collection in self._indexes:
+            return self._indexes[collection]
+
+        lock = self._locks.setdefault(collection, asyncio.Lock())
+        async with lock:
+            if collection not in self._indexes:
+                self._indexes[collection] = await self._load(collection, coll)
+        return self._indexes[collection]
+
+    def invalidate(self, collection: Optional[MongoCollection] = None):
+        if collection is None:
+            self._indexes.clear()
+        else:
+            self._indexes.pop(collection, None)
+
+    async def _load(self, collection: MongoCollection, coll: AsyncCollection) -> LocalSearchIndex:
+        text_fields = TEXT_FIELDS[collection]
+        projection = { "_id": 1, "embeddings": 1, **{ f: 1 for f in text_fields + FILTER_FIELDS } }
+        docs = await coll.find({ "embeddings": { "$exists": True } }, projection).sort("_id", 1).to_list()
+
+        ids = [d["_id"] for d in docs]
+        vectors = np.stack([to_numpy(d["embeddings"]) for d in docs]) if len(docs) > 0 else np.zeros((0, 0), dtype=np.float32)
+        if self.cache_dir is not None and len(docs) > 0:
+            # keep the matrix out of the python heap, pages are shared by the workers of a node
+            vectors = await asyncio.to_thread(self._mmap, collection, ids, vectors)
+
+        texts = [" ".join(str(d.get(f, "")) for f in text_fields) for d in docs]
+        filter_values = { f: [d.get(f, None) for d in docs] for f in FILTER_FIELDS }
+
+        info_logger.info(f"Loaded {len(docs)} documents of {collection.value} into the local search index")
+        return LocalSearchIndex(ids, vectors, texts, filter_values)
+
+    def _mmap(self, collection: MongoCollection, ids: List[Any], vectors: np.ndarray) -> np.ndarray:
+        """
+        Memory-map the matrix from a file named after its content. A file is never rewritten once mapped:
+        a new matrix goes to a temp file renamed onto a new name, identical matrices reuse the existing file.
+        Older versions of the collection are unlinked once the new one is written, workers mapping them keep
+        their pages until they reload.
+        """
+        digest = hashlib.blake2b(np.ascontiguousarray(vectors).data, digest_size=8)
+        digest.update(repr(ids).encode())
+        os.makedirs(self.cache_dir, exist_ok=True)
+        name = f"{collection.value}-{len(ids)}-{digest.hexdigest()}.npy"
+        path = os.path.join(self.cache_dir, name)
+        for _ in range(2):
+            if not os.path.exists(path):
+                fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=f".{collection.value}-", suffix=".npy")
+                try:
+                    with os.fdopen(fd, "wb") as f:
+                        np.save(f, vectors)
+                    os.replace(tmp_path, path)
+                except BaseException:
+                    os.unlink(tmp_path)
+                    raise
+                self._prune(collection, keep=name)
+            try:
+                return np.load(path, mmap_mode="r")
+            except FileNotFoundError:
+                # pruned by a worker holding newer data between the check and the load, write it again
+                continue
+        return vectors
+
+    def _prune(self, collection: MongoCollection, keep: str):
+        pattern = re.compile(rf"{re.escape(collection.value)}-\d+-[0-9a-f]{{16}}\.npy")
+        for name in os.listdir(self.cache_dir):
+            if name != keep and pattern.fullmatch(name):
+                try:
+                    os.unlink(os.path.join(self.cache_dir, name))
+                except FileNotFoundError:
+                    pass
+
+    async def search(
+            self,
+            coll: AsyncCollection,
+            collection: MongoCollection,
+            query: str,
+            query_vector: List[float],
+            weights: Dict[MongoIndex, float],
+            reciprocal_c: float,
+            n_results: int = 3,
+            limit: int = 20,
+            filter: Dict[str, Any] = {},
+            proj: Dict[str, Any] = {}
+        ) -> List[Dict[str, Any]]:
+        index = await self.get_index(collection, coll)
+
+        # weighted reciprocal rank fusion, same formula as the atlas pipeline
+        top = reciprocal_rank_fusion([
+            (weights[MongoIndex.VECTOR], index.vector_search(query_vector, index.filter_mask(filter, vector=True), limit)),
+            (weights[MongoIndex.FULL_TEXT], index.text_search(query, index.filter_mask(filter, vector=False), limit)),
+        ], n_results, reciprocal_c)
+        ids = [index.ids[i] for i, _ in top]
+        if len(ids) == 0:
+            return []
+
+        return await fetch_ranked(coll, ids, proj)
+
+async def fetch_ranked(coll: AsyncCollection, ids: List[Any], proj: Dict[str, Any] = {}) -> List[Dict[str, Any]]:
+    """Fetch documents by _id in the given order, with the result projection of hybrid_search"""
+    pipeline = [
+        { "$match": { "_id": { "$in": ids } } },
+        { "$addFields": { "_rank": { "$indexOfArray": [ids, "$_id"] } } },
+        { "$sort": { "_rank": 1 } },
+        { "$project": { **RESULT_EXCLUDED_FIELDS, "_rank": 0 } }
+    ]
+    if (proj): pipeline.append({ "$project": proj })
+
+    response = await coll.aggregate(pipeline)
+    return await response.to_list()
@@ -2,11 +2,20 @@ from langchain_mongodb import MongoDBAtlasVectorSearch
 from dotenv import load_dotenv
 from functools import lru_cache
 from pymongo import AsyncMongoClient, MongoClient
-from typing import Dict, Optional, Any
-from llm.huggingface import get_huggingface_embedding, generate_bson_vector
-from .enums import MongoCollection, MongoIndex
-from .types import Course
-from .utils import SEARCH_WEIGHTS, RECIPROCAL_C, generate_vector_search_filter, generate_search_filter, generate_search_stage
+from pymongo.errors import ConnectionFailure
+from typing import Awaitable, Dict, List, Optional, Any, Tuple, TypeVar
+from llm.huggingface import get_huggingface_embedding, aget_huggingface_embedding
+from .enums import MongoCollection, MongoIndex, VectorQuantization, SearchEngine, FusionStrategy, SearchLimitMode, ProjectionProfile
+from .local_search import LocalSearchEngine, fetch_ranked
+from .cache import SearchResultCache, search_cache_key
+from .health import ConnectionMonitor, CircuitOpenError
+from .catalog import CourseCatalog
+from .profiling import summarize_explain
+from .types import Course, SearchLimits, SearchRequest
+from .utils import SEARCH_WEIGHTS, RECIPROCAL_C, FUSION_STRATEGIES, RESULT_EXCLUDED_FIELDS, reciprocal_rank_fusion, generate_search_limits, generate_vector_search_filter, generate_vector_search_stages, generate_full_text_search_stage, resolve_projection
+import asyncio
+import json
+import time
 import os
 import logging
 from warnings import deprecated
@@ -14,6 +23,9 @@ from warnings import deprecated
 load_dotenv()
 
 info_logger = logging.getLogger("uvicorn.info")
+warning_logger = logging.getLogger("uvicorn.warning")
+
+T = TypeVar("T")
 
 class MongoDBClient:
     _instance: Optional["MongoDBClient"] = None
@@ -61,9 +73,41 @@ class MongoDBClient:
         self.database_name = database_name
         self._client: MongoClient = None # for langchain vector store usage
         self._async_client: AsyncMongoClient = None # for query with atlas search
+        self._async_client_lock = asyncio.Lock() # one client created at a time, see get_async_client and _reconnect_async
         self._stores: Dict[str, MongoDBAtlasVectorSearch] = {}
         self.__class__._initialized = True
         self.__class__._search_weights = SEARCH_WEIGHTS
+        self._vector_quantization = VectorQuantization(os.getenv("VECTOR_QUANTIZATION") or VectorQuantization.FLOAT32.value)
+        self._search_engine = SearchEngine(os.getenv("SEARCH_ENGINE") or SearchEngine.ATLAS.value)
+        # FUSION_STRATEGY applies to every collection, FUSION_STRATEGY_<COLLECTION> (e.g. FUSION_STRATEGY_COURSE) to one
+        self._fusion_strategies = {
+            collection: FusionStrategy(
+                os.getenv(f"FUSION_STRATEGY_{collection.name.upper()}") or os.getenv("FUSION_STRATEGY") or strategy.value
+            )
+            for collection, strategy in FUSION_STRATEGIES.items()
+        }
+        self._local_search = LocalSearchEngine(os.getenv("LOCAL_SEARCH_PATH")) if self._search_engine == SearchEngine.LOCAL else None
+        self._search_limit_mode = SearchLimitMode(os.getenv("SEARCH_LIMITS") or SearchLimitMode.FIXED.value)
+        self._filter_counts: Dict[Tuple[str, str], int] = {} # catalog is read-only within a year, counts are cached until invalidated
+        self._search_cache = SearchResultCache(
+            max_bytes=int(os.getenv("SEARCH_CACHE_MAX_BYTES") or 64 * 2**20), # 0 to disable
+            ttl=float(os.getenv("SEARCH_CACHE_TTL") or 86400)
+        )
+        self._slow_search_ms = float(os.getenv("SEARCH_SLOW_MS") or 0) # log the timings of slower searches, 0 to disable
+        # requests read the breaker state instead of pinging, the monitor pings and reconnects in the background
+        self._health = ConnectionMonitor(
+            self._ping,
+            self._reconnect_async,
+            interval=float(os.getenv("MONGODB_HEALTH_INTERVAL") or 10),
+            timeout=float(os.getenv("MONGODB_HEALTH_TIMEOUT") or 5),
+            failure_threshold=int(os.getenv("MONGODB_FAILURE_THRESHOLD") or 3),
+            max_backoff=float(os.getenv("MONGODB_MAX_BACKOFF") or 60)
+        )
+        # plan generation looks courses up in memory, COURSE_CATALOG=false keeps it on atlas search
+        self._course_catalog = CourseCatalog(
+            lambda: self.get_async_collection(MongoCollection.Course),
+            refresh_interval=float(os.getenv("COURSE_CATALOG_REFRESH") or 300)
+        ) if (os.getenv("COURSE_CATALOG") or "true") == "true" else None
 
     def get_client(self):
         """Get or create MongoClient"""
@@ -77,10 +121,13 @@ class MongoDBClient:
     async def get_async_client(self):
         """Get or create AsyncMongoClient"""
         if self._async_client is None:
-            self._async_client = AsyncMongoClient(self.uri)
-            # Verify connection
-            await self._async_client.admin.command('ping')
-            # print("Async client created")
+            async with self._async_client_lock:
+                if self._async_client is None:
+                    client = AsyncMongoClient(self.uri)
+                    # Verify connection
+                    await client.admin.command('ping')
+                    self._async_client = client
+                    # print("Async client created")
         return self._async_client
     
     async def get_async_collection(self, collection: MongoCollection):
@@ -104,10 +151,7 @@ class MongoDBClient:
             # print(e)
 
             if async_client:
-                if self._async_client is not None:
-                    await self._async_client.aclose()
-                self._async_client = None
-                await self.get_async_client()
+                await self._reconnect_async()
             else:
                 if self._client is not None:
                     self._client.close()
@@ -116,6 +160,69 @@ class MongoDBClient:
                 self.get_client()
             
             return False
+
+    async def _ping(self):
+        client = await self.get_async_client()
+        await client.admin.command('ping')
+
+    async def _reconnect_async(self):
+        """Swap in a new async client, requests keep the current one until the swap, the old one is closed after"""
+        async with self._async_client_lock:
+            client = AsyncMongoClient(self.uri)
+            try:
+                await client.admin.command('ping')
+            except BaseException:
+                await client.aclose()
+                raise
+            previous, self._async_client = self._async_client, client
+        if previous is not None:
+            await previous.aclose()
+
+    def start_health_monitor(self):
+        """Start the background health check on the running loop"""
+        self._health.start()
+
+    async def load_course_catalog(self):
+        """Load the course catalog snapshot and keep it current in the background"""
+        if self._course_catalog is None:
+            return
+        await self._course_catalog.load()
+        self._course_catalog.start()
+
+    def course_catalog(self) -> Optional[CourseCatalog]:
+        """The loaded course catalog snapshot, None if disabled or not loaded yet"""
+        if self._course_catalog is None or not self._course_catalog.ready:
+            return None
+        return self._course_catalog
+
+    def course_catalog_stats(self) -> Dict[str, Any]:
+        if self._course_catalog is None:
+            return { "enabled": False }
+        return { "enabled": True, **self._course_catalog.stats() }
+
+    def ensure_healthy(self):
+        """Hot path connection check, no round trip, fails fast while the circuit is open"""
+        self._health.start()
+        if not self._health.allow_request():
+            raise CircuitOpenError(
+                f"MongoDB unavailable, retrying in {self._health.retry_in():.1f}s (last error: {self._health.last_error})"
+            )
+
+    async def _monitored(self, awaitable: Awaitable[T]) -> T:
+        """Feed the outcome of a request into the circuit breaker, a success closes a half open circuit"""
+        try:
+            result = await awaitable
+        except CircuitOpenError:
+            # fail fast rejections would push the retry back and double the backoff
+            raise
+        except ConnectionFailure as e:
+            self._health.record_failure(e)
+            raise
+        self._health.record_success()
+        return result
+
+    def health_stats(self) -> Dict[str, Any]:
+        return self._health.stats()
     
     @deprecated("Will be moved hybrid search for all")
     async def query(self,
@@ -123,7 +230,7 @@ class MongoDBClient:
             query: str,
             n_results: int = 10):
         """Search for documents"""
-        await self.ensure_connection(async_client=True)
+        self.ensure_healthy()
 
         # use async client to query, get corresponding collection
         client = await self.get_async_client()
@@ -168,37 +275,356 @@ class MongoDBClient:
             *,
             filter: Dict[str, Any] = {}, # use to filter out documents by criteria
             proj: Dict[str, Any] = {}, # use to keep wanted fields
+            projection: Optional[ProjectionProfile] = None, # named projection of PROJECTION_PROFILES, ignored when proj is given
+            fusion: Optional[FusionStrategy] = None, # defaults to the strategy configured for the collection
+            limit_mode: Optional[SearchLimitMode] = None, # defaults to SEARCH_LIMITS
+            cache: bool = True, # serve and store results in the search result cache
+            profile: bool = False, # return { results, profile } with timings and the explained pipeline, uncached
         ):
-        await self.ensure_connection(async_client=True)
+        proj = resolve_projection(collection, projection, proj)
+        if profile:
+            return await self.profile_search(query, collection, n_results, filter=filter, proj=proj, fusion=fusion, limit_mode=limit_mode)
+        if not cache:
+            return await self._monitored(
+                self._hybrid_search(query, collection, n_results, filter=filter, proj=proj, fusion=fusion, limit_mode=limit_mode)
+            )
+
+        # catalog collections only change between academic years, identical searches are served from memory
+        key = search_cache_key(collection, query, n_results, filter, proj, *self.search_modes(collection, fusion, limit_mode))
+        results = self._search_cache.get(key)
+        if results is not None:
+            return results
+
+        results = await self._monitored(
+            self._hybrid_search(query, collection, n_results, filter=filter, proj=proj, fusion=fusion, limit_mode=limit_mode)
+        )
+        self._search_cache.put(key, results)
+
+        return results
+
+    async def hybrid_search_many(self, requests: List[SearchRequest]) -> List[List[Dict[str, Any]]]:
+        """
+        Run several hybrid searches at once, e.g. the sibling search tool calls of one LLM turn.
+        Cached requests are answered from memory, the remaining queries are embedded in one batch
+        and searched concurrently over the connection pool. Results are returned in request order.
+        """
+        requests = [
+            SearchRequest(**{ **r, "proj": resolve_projection(r["collection"], r.get("projection"), r.get("proj", {})) })
+            for r in requests
+        ]
+        keys = [
+            search_cache_key(
+                r["collection"], r["query"], r.get("n_results", 3), r.get("filter", {}), r["proj"],
+                *self.search_modes(r["collection"], r.get("fusion"), r.get("limit_mode"))
+            )
+            for r in requests
+        ]
+        results: Dict[Tuple, List[Dict[str, Any]]] = {}
+        pending: Dict[Tuple, SearchRequest] = {}
+        for key, request in zip(keys, requests):
+            if key in results or key in pending:
+                continue
+            cached = self._search_cache.get(key)
+            if cached is not None:
+                results[key] = cached
+            else:
+                pending[key] = request
+
+        if len(pending) > 0:
+            ef = await aget_huggingface_embedding()
+            queries = [r["query"] for r in pending.values()]
+            if hasattr(ef, "aembed_queries"):
+                vectors = await ef.aembed_queries(queries)
+            else:
+                vectors = await ef.aembed_documents(queries)
+
+            searched = await self._monitored(asyncio.gather(*(
+                self._hybrid_search(
+                    r["query"],
+                    r["collection"],
+                    r.get("n_results", 3),
+                    filter=r.get("filter", {}),
+                    proj=r["proj"],
+                    fusion=r.get("fusion"),
+                    limit_mode=r.get("limit_mode"),
+                    embeddings=vector
+                )
+                for r, vector in zip(pending.values(), vectors)
+            )))
+            for key, docs in zip(pending.keys(), searched):
+                self._search_cache.put(key, docs)
+                results[key] = docs
+
+        return [results[key] for key in keys]
+
+    def search_modes(
+            self,
+            collection: MongoCollection,
+            fusion: Optional[FusionStrategy] = None,
+            limit_mode: Optional[SearchLimitMode] = None
+        ) -> Tuple[FusionStrategy, SearchLimitMode]:
+        """Fusion strategy and limit mode a search runs with, the configured defaults unless given"""
+        return fusion or self._fusion_strategies[collection], limit_mode or self._search_limit_mode
+
+    def invalidate_search_cache(self, collection: Optional[MongoCollection] = None):
+        """Drop cached search results (and local search indexes) after the catalog changes"""
+        self._search_cache.invalidate(collection)
+        self._filter_counts = { k: v for k, v in self._filter_counts.items() if collection is not None and k[0] != collection.value }
+        if self._local_search is not None:
+            self._local_search.invalidate(collection)
+
+    def search_cache_enabled(self) -> bool:
+        return self._search_cache.max_bytes > 0
+
+    def search_cache_stats(self) -> Dict[str, Any]:
+        return self._search_cache.stats()
+
+    async def find_documents(
+            self,
+            collection: MongoCollection,
+            match: Dict[str, Any],
+            projection: ProjectionProfile = ProjectionProfile.FULL,
+            limit: int = 20
+        ) -> List[Dict[str, Any]]:
+        """Documents matching a plain query with the result projection of hybrid_search, e.g. details of known courses"""
+        self.ensure_healthy()
+        proj = resolve_projection(collection, projection)
+        pipeline = [
+            { "$match": match },
+            { "$limit": limit },
+            { "$project": RESULT_EXCLUDED_FIELDS },
+            *([{ "$project": proj }] if proj else [])
+        ]
+        coll = await self.get_async_collection(collection)
+
+        async def run():
+            response = await coll.aggregate(pipeline)
+            return await response.to_list()
+
+        return await self._monitored(run())
+
+    async def count_matching(self, collection: MongoCollection, filter: Dict[str, Any] = {}) -> int:
+        """Number of documents matching a search filter, cached per collection and filter"""
+        vector_filter = generate_vector_search_filter(filter)
+        key = (collection.value, json.dumps(vector_filter, sort_keys=True, default=str))
+        if key not in self._filter_counts:
+            coll = await self.get_async_collection(collection)
+            if vector_filter:
+                self._filter_counts[key] = await coll.count_documents(vector_filter)
+            else:
+                self._filter_counts[key] = await coll.estimated_document_count()
+        return self._filter_counts[key]
+
+    async def search_limits(
+            self,
+            collection: MongoCollection,
+            n_results: int = 3,
+            filter: Dict[str, Any] = {},
+            mode: Optional[SearchLimitMode] = None
+        ) -> SearchLimits:
+        """numCandidates and per branch limit used by hybrid_search"""
+        mode = mode or self._search_limit_mode
+        if mode == SearchLimitMode.FIXED:
+            return generate_search_limits(n_results)
+
+        limits = generate_search_limits(n_results, await self.count_matching(collection, filter), mode)
+        info_logger.debug(f"Search limits for {collection.value} n_results={n_results} filter={filter}: {limits}")
+        return limits
+
+    async def _hybrid_search(
+            self,
+            query: str,
+            collection: MongoCollection,
+            n_results = 3,
+            *,
+            filter: Dict[str, Any] = {},
+            proj: Dict[str, Any] = {},
+            fusion: Optional[FusionStrategy] = None,
+            limit_mode: Optional[SearchLimitMode] = None,
+            embeddings: Optional[List[float]] = None, # precomputed query vector
+            trace: Optional[Dict[str, Any]] = None, # filled with timings and the search parameters
+        ):
+        started = time.perf_counter()
+        trace = trace if trace is not None else {}
+        timings: Dict[str, float] = trace.setdefault("timings_ms", {})
+
+        async def timed(name: str, awaitable: Awaitable[T]) -> T:
+            step_started = time.perf_counter()
+            result = await awaitable
+            timings[name] = 1000 * (time.perf_counter() - step_started)
+            return result
+
+        self.ensure_healthy()
 
         client = await self.get_async_client()
         db = client[self.database_name]
         coll = db[collection.value]
 
-        ef = get_huggingface_embedding()
-        embeddings = await ef.aembed_query(query)
-        embeddings = generate_bson_vector(embeddings)
+        if embeddings is None:
+            ef = await aget_huggingface_embedding()
+            embeddings, limits = await asyncio.gather(
+                timed("embedding", ef.aembed_query(query)),
+                timed("limits", self.search_limits(collection, n_results, filter, limit_mode))
+            )
+        else:
+            limits = await timed("limits", self.search_limits(collection, n_results, filter, limit_mode))
+
+        strategy = fusion or self._fusion_strategies[collection]
+        trace.update({ "embeddings": embeddings, "limits": limits, "strategy": strategy, "engine": self._search_engine })
+        results = await timed("search", self._run_search(coll, query, collection, n_results, filter, proj, strategy, embeddings, limits))
+
+        timings["total"] = 1000 * (time.perf_counter() - started)
+        if self._slow_search_ms > 0 and timings["total"] > self._slow_search_ms:
+            warning_logger.warning(
+                f"Slow hybrid_search on {collection.value} ({strategy.value}) query={query!r} filter={filter}: "
+                + ", ".join(f"{k}={v:.1f}ms" for k, v in timings.items())
+            )
+
+        return results
+
+    async def _run_search(
+            self,
+            coll,
+            query: str,
+            collection: MongoCollection,
+            n_results: int,
+            filter: Dict[str, Any],
+            proj: Dict[str, Any],
+            strategy: FusionStrategy,
+            embeddings: List[float],
+            limits: SearchLimits
+        ):
+        if self._local_search is not None:
+            # in-process ranking, works against a plain mongod without search indexes
+            return await self._local_search.search(
+                coll,
+                collection,
+                query,
+                embeddings,
+                self._search_weights[collection],
+                RECIPROCAL_C,
+                n_results,
+                limit=limits["limit"],
+                filter=filter,
+                proj=proj
+            )
+
+        if strategy == FusionStrategy.CLIENT:
+            return await self._client_fusion_search(coll, collection, query, embeddings, n_results, filter, proj, limits)
+
+        pipeline = self.build_hybrid_search_pipeline(
+            query,
+            collection,
+            embeddings,
+            n_results,
+            filter=filter,
+            proj=proj,
+            slim=strategy == FusionStrategy.SLIM,
+            limits=limits
+        )
+
+        response = await coll.aggregate(pipeline=pipeline)
+        results = await response.to_list()
+        
+        return results
+
+    async def profile_search(
+            self,
+            query: str,
+            collection: MongoCollection,
+            n_results = 3,
+            *,
+            filter: Dict[str, Any] = {},
+            proj: Dict[str, Any] = {},
+            fusion: Optional[FusionStrategy] = None,
+            limit_mode: Optional[SearchLimitMode] = None,
+        ) -> Dict[str, Any]:
+        """
+        Run one uncached search recording the time of each step, then explain the aggregation(s) it ran
+        (executionStats) for a per stage breakdown of documents returned, examined and time spent.
+        """
+        trace: Dict[str, Any] = {}
+        results = await self._monitored(self._hybrid_search(
+            query, collection, n_results, filter=filter, proj=proj, fusion=fusion, limit_mode=limit_mode, trace=trace
+        ))
+        strategy: FusionStrategy = trace["strategy"]
+        limits: SearchLimits = trace["limits"]
+
+        if self._local_search is not None:
+            pipelines = {} # ranked in process, only the final fetch by _id runs on the server
+        elif strategy == FusionStrategy.CLIENT:
+            vector_pipeline, full_text_pipeline = self.build_branch_pipelines(query, collection, trace["embeddings"], filter, limits)
+            pipelines = { "vector": vector_pipeline, "full_text": full_text_pipeline }
+        else:
+            pipelines = { "hybrid": self.build_hybrid_search_pipeline(
+                query,
+                collection,
+                trace["embeddings"],
+                n_results,
+                filter=filter,
+                proj=proj,
+                slim=strategy == FusionStrategy.SLIM,
+                limits=limits
+            ) }
+
+        explained = {}
+        for name, pipeline in pipelines.items():
+            started = time.perf_counter()
+            explain = await self.explain_aggregate(collection, pipeline)
+            explained[name] = { "explain_ms": 1000 * (time.perf_counter() - started), "stages": summarize_explain(explain) }
+
+        return {
+            "results": results,
+            "profile": {
+                "collection": collection.value,
+                "query": query,
+                "engine": trace["engine"].value,
+                "strategy": strategy.value,
+                "limits": limits,
+                "n_results": len(results),
+                "timings_ms": trace["timings_ms"],
+                "pipelines": explained
+            }
+        }
+
+    async def explain_aggregate(self, collection: MongoCollection, pipeline: List[Dict[str, Any]]) -> Dict[str, Any]:
+        client = await self.get_async_client()
+        db = client[self.database_name]
+        return await db.command(
+            "explain",
+            { "aggregate": collection.value, "pipeline": pipeline, "cursor": {} },
+            verbosity="executionStats"
+        )
+
+    def build_hybrid_search_pipeline(
+            self,
+            query: str,
+            collection: MongoCollection,
+            embeddings,
+            n_results = 3,
+            *,
+            filter: Dict[str, Any] = {},
+            proj: Dict[str, Any] = {},
+            slim: bool = False, # rank and fuse on _id + scores, look up the final documents
+            limits: Optional[SearchLimits] = None, # fixed limits if not given
+        ):
+        """Server side fusion pipeline of hybrid_search"""
+        limits = limits or generate_search_limits(n_results)
         vector_weight = self._search_weights[collection][MongoIndex.VECTOR]
         full_text_weight = self._search_weights[collection][MongoIndex.FULL_TEXT]
 
         vector_pipeline = [
-            # 1. vector search
-            {
-                "$vectorSearch": {
-                    "index": "vector_index",
-                    "path": "embeddings",
-                    "queryVector": embeddings,
-                    "numCandidates": 100,
-                    "limit": 20,
-                    "filter": generate_vector_search_filter(filter) # can be empty dict
-                }
-            },
-            # add vectorScore
-            {
-                "$addFields": {
-                    "vector_search_score": { "$meta": "vectorSearchScore" }
-                }
-            },
+            # 1. vector search, add vectorScore (rescored if searching a quantized field)
+            *generate_vector_search_stages(
+                embeddings,
+                filter,
+                quantization=self._vector_quantization,
+                num_candidates=limits["num_candidates"],
+                limit=limits["limit"],
+                exact=limits["exact"]
+            ),
+            # slim: only carry _id and score through the group
+            *([{ "$project": { "_id": 1, "vector_search_score": 1 } }] if slim else []),
             # group into one doc with docs fields for ranks
             {
                 "$group": {
@@ -231,18 +657,10 @@ class MongoDBClient:
         # 2. full text search
         full_text_pipeline = [
             # $search stage, supports text
-            {   
-                "$search": {
-                    "index": "full_text_index",
-                    "compound": {
-                        "should": generate_search_stage(query, collection=collection),
-                        "filter": generate_search_filter(filter)
-                    }
-                }
-            },
-            # limit to 20 results
+            generate_full_text_search_stage(query, collection, filter),
+            # same number of results as the vector branch
             {
-                "$limit": 20
+                "$limit": limits["limit"]
             },
             # add search score
             {
@@ -250,6 +668,7 @@ class MongoDBClient:
                     "search_score": { "$meta": "searchScore" },
                 }
             },
+            *([{ "$project": { "_id": 1, "search_score": 1 } }] if slim else []),
             # push
             {
                 "$group": {
@@ -324,39 +743,114 @@ class MongoDBClient:
                 "$limit": n_results
             },
             # extract other fields to result document
-            {
-                "$replaceRoot": {
-                    "newRoot": {
-                        "$mergeObjects": ["$$ROOT", "$docs"]
+            *(self._lookup_result_stages(collection, proj) if slim else [
+                {
+                    "$replaceRoot": {
+                        "newRoot": {
+                            "$mergeObjects": ["$$ROOT", "$docs"]
+                        }
+                    }
+                },
+                {
+                    "$project": {
+                        **RESULT_EXCLUDED_FIELDS,
+                        "docs": 0,
+                        "vs_score": 0,
+                        "fts_score": 0,
+                        "score": 0,
+                        "search_score": 0,
+                        "vector_search_score": 0
                     }
                 }
-            },
+            ])
+        ]
+
+        if (proj and not slim): pipeline.append({ "$project": proj })
+
+        return pipeline
+
+    def _lookup_result_stages(self, collection: MongoCollection, proj: Dict[str, Any] = {}):
+        """Fetch the fused n_results documents by _id, projected before they enter the pipeline"""
+        return [
             {
-                "$project": {
-                    "_id": 0,
-                    "embeddings": 0,
-                    "docs": 0,
-                    "createdAt": 0,
-                    "updatedAt": 0,
-                    "__v": 0,
-                    "vs_score": 0,
-                    "fts_score": 0,
-                    "score": 0,
-                    "search_score": 0,
-                    "vector_search_score": 0
+                "$lookup": {
+                    "from": collection.value,
+                    "localField": "_id",
+                    "foreignField": "_id",
+                    "pipeline": [{ "$project": RESULT_EXCLUDED_FIELDS }, *([{ "$project": proj }] if proj else [])],
+                    "as": "docs"
                 }
-            }
+            },
+            { "$unwind": "$docs" },
+            { "$replaceRoot": { "newRoot": "$docs" } }
+        ]
+
+    def build_branch_pipelines(
+            self,
+            query: str,
+            collection: MongoCollection,
+            embeddings,
+            filter: Dict[str, Any],
+            limits: SearchLimits
+        ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Vector and full text pipelines returning only _id and score, for client side fusion"""
+        vector_pipeline = [
+            *generate_vector_search_stages(
+                embeddings,
+                filter,
+                quantization=self._vector_quantization,
+                num_candidates=limits["num_candidates"],
+                limit=limits["limit"],
+                exact=limits["exact"]
+            ),
+            { "$project": { "_id": 1, "vector_search_score": 1 } }
+        ]
+        full_text_pipeline = [
+            generate_full_text_search_stage(query, collection, filter),
+            { "$limit": limits["limit"] },
+            { "$project": { "_id": 1, "search_score": { "$meta": "searchScore" } } }
         ]
+        return vector_pipeline, full_text_pipeline
+
+    async def _client_fusion_search(
+            self,
+            coll,
+            collection: MongoCollection,
+            query: str,
+            embeddings,
+            n_results: int,
+            filter: Dict[str, Any],
+            proj: Dict[str, Any],
+            limits: SearchLimits
+        ):
+        """
+        Run both branches concurrently returning only _id and score, fuse the ranks in python,
+        then fetch the top n_results documents. No $unionWith and no whole documents pushed into one array.
+        """
+        async def ranked_ids(pipeline, score_field: str):
+            response = await coll.aggregate(pipeline)
+            return [(d["_id"], d[score_field]) for d in await response.to_list()]
 
-        if (proj): pipeline.append({ "$project": proj })
+        vector_pipeline, full_text_pipeline = self.build_branch_pipelines(query, collection, embeddings, filter, limits)
+        vector_results, full_text_results = await asyncio.gather(
+            ranked_ids(vector_pipeline, "vector_search_score"),
+            ranked_ids(full_text_pipeline, "search_score")
+        )
 
-        response = await coll.aggregate(pipeline=pipeline)
-        results = await response.to_list()
-        
-        return results
+        top = reciprocal_rank_fusion([
+            (self._search_weights[collection][MongoIndex.VECTOR], vector_results),
+            (self._search_weights[collection][MongoIndex.FULL_TEXT], full_text_results),
+        ], n_results, RECIPROCAL_C)
+        if len(top) == 0:
+            return []
+
+        return await fetch_ranked(coll, [_id for _id, _ in top], proj)
 
     async def close(self):
         """Clean up resources"""
+        await self._health.stop()
+        if self._course_catalog is not None:
+            await self._course_catalog.stop()
         if self._client is not None:
             self._client.close()
             self._client = None
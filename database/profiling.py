@@ -0,0 +1,70 @@
+from typing import Any, Dict, List, Optional
+from typing_extensions import TypedDict
+
+class StageProfile(TypedDict, total=False):
+    stage: str # e.g. $vectorSearch, $search, $unionWith, $group
+    n_returned: int
+    time_ms: int # cumulative executionTimeMillisEstimate reported by the server
+    self_ms: int # time of this stage alone, difference with the previous stage
+    docs_examined: int
+    keys_examined: int
+    stages: List["StageProfile"] # sub-pipeline of $unionWith / $lookup / $facet
+
+def _find(value: Any, key: str) -> Optional[Any]:
+    """First value of a key anywhere in a nested explain document"""
+    if isinstance(value, dict):
+        if key in value:
+            return value[key]
+        value = list(value.values())
+    if isinstance(value, list):
+        for v in value:
+            found = _find(v, key)
+            if found is not None:
+                return found
+    return None
+
+def summarize_stages(stages: List[Dict[str, Any]]) -> List[StageProfile]:
+    """Per stage breakdown of the `stages` array of an aggregate explain with executionStats verbosity"""
+    summary: List[StageProfile] = []
+    previous_ms = 0
+    for stage in stages:
+        name = next((k for k in stage if k.startswith("$")), "unknown")
+        body = stage.get(name, {})
+        profile: StageProfile = { "stage": name }
+
+        if "nReturned" in stage:
+            profile["n_returned"] = stage["nReturned"]
+        if "executionTimeMillisEstimate" in stage:
+            profile["time_ms"] = stage["executionTimeMillisEstimate"]
+            profile["self_ms"] = max(0, stage["executionTimeMillisEstimate"] - previous_ms)
+            previous_ms = stage["executionTimeMillisEstimate"]
+
+        for field, key in [("docs_examined", "totalDocsExamined"), ("keys_examined", "totalKeysExamined")]:
+            found = _find(body, key)
+            if found is not None:
+                profile[field] = found
+
+        # $unionWith reports its pipeline as nested stages
+        if isinstance(body, dict) and isinstance(body.get("pipeline"), list) and \
+           all(isinstance(s, dict) for s in body["pipeline"]):
+            profile["stages"] = summarize_stages(body["pipeline"])
+
+        summary.append(profile)
+    return summary
+
+def summarize_explain(explain: Dict[str, Any]) -> List[StageProfile]:
+    if "stages" in explain:
+        return summarize_stages(explain["stages"])
+    # sharded clusters report the stages of every shard
+    if "shards" in explain:
+        return [
+            { "stage": f"shard {shard}", "stages": summarize_explain(shard_explain) }
+            for shard, shard_explain in explain["shards"].items()
+        ]
+    # single stage pipelines may be explained as a plain query plan
+    return [{
+        "stage": "query",
+        "n_returned": _find(explain, "nReturned") or 0,
+        "time_ms": _find(explain, "executionTimeMillis") or 0,
+        "docs_examined": _find(explain, "totalDocsExamined") or 0,
+    }]
@@ -0,0 +1,98 @@
+"""
+Quantized copies of the `embeddings` field.
+
+Write time: `uv run python -m database.quantization --mode int8` adds a quantized BSON vector next to the
+full precision embeddings of every document. The vector index must also index the new field,
+see `quantized_index_fields`.
+Query time: `hybrid_search` searches the quantized field and rescores the shortlist with `embeddings`.
+"""
+from bson.binary import Binary, BinaryVectorDtype
+from pymongo import UpdateOne
+from pymongo.collection import Collection
+from typing import Any, Dict, List
+from .enums import MongoCollection, VectorQuantization
+import numpy as np
+import logging
+
+info_logger = logging.getLogger("uvicorn.info")
+
+QUANTIZED_FIELDS = {
+    VectorQuantization.FLOAT32: "embeddings",
+    VectorQuantization.INT8: "embeddings_int8",
+    VectorQuantization.BINARY: "embeddings_bits",
+}
+
+def to_numpy(vector: List[float] | Binary) -> np.ndarray:
+    if isinstance(vector, Binary):
+        vector = vector.as_vector().data
+    return np.asarray(vector, dtype=np.float32)
+
+def quantize_vector(vector: List[float] | np.ndarray, mode: VectorQuantization) -> Binary:
+    """Convert a full precision vector to the BSON vector stored (and queried) for the given mode"""
+    vector = np.asarray(vector, dtype=np.float32)
+
+    if mode == VectorQuantization.INT8:
+        # per vector scale, the int8 field is indexed with cosine similarity so the scale cancels out
+        scale = np.max(np.abs(vector))
+        values = np.round(vector / scale * 127) if scale > 0 else np.zeros_like(vector)
+        return Binary.from_vector(values.astype(np.int8).tolist(), BinaryVectorDtype.INT8)
+    elif mode == VectorQuantization.BINARY:
+        bits = np.packbits(vector > 0)
+        return Binary.from_vector(bits.tolist(), BinaryVectorDtype.PACKED_BIT, padding=(-len(vector)) % 8)
+    else:
+        return Binary.from_vector(vector.tolist(), BinaryVectorDtype.FLOAT32)
+
+def quantized_index_fields(dimensions: int = 1024) -> List[Dict[str, Any]]:
+    """Vector index fields to add to `vector_index` (next to the existing `embeddings` field and filters)"""
+    return [
+        {
+            "type": "vector",
+            "path": QUANTIZED_FIELDS[VectorQuantization.INT8],
+            "numDimensions": dimensions,
+            "similarity": "cosine"
+        },
+        {
+            "type": "vector",
+            "path": QUANTIZED_FIELDS[VectorQuantization.BINARY],
+            "numDimensions": dimensions,
+            "similarity": "euclidean" # hamming distance for packed bits
+        }
+    ]
+
+def quantize_collection(coll: Collection, mode: VectorQuantization, batch_size: int = 500) -> int:
+    """Write the quantized copy of `embeddings` for every document, the original field is kept for rescoring"""
+    field = QUANTIZED_FIELDS[mode]
+    updates: List[UpdateOne] = []
+    written = 0
+
+    for doc in coll.find({ "embeddings": { "$exists": True } }, { "_id": 1, "embeddings": 1 }):
+        updates.append(UpdateOne({ "_id": doc["_id"] }, { "$set": { field: quantize_vector(to_numpy(doc["embeddings"]), mode) } }))
+        if len(updates) >= batch_size:
+            written += coll.bulk_write(updates, ordered=False).modified_count
+            updates = []
+
+    if len(updates) > 0:
+        written += coll.bulk_write(updates, ordered=False).modified_count
+
+    info_logger.info(f"{coll.name}: wrote {written} {field} vectors")
+    return written
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from .mongodb import MongoDBClient
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", required=True, choices=[VectorQuantization.INT8.value, VectorQuantization.BINARY.value])
+    parser.add_argument("--collections", nargs="+", default=[c.name for c in MongoCollection], choices=[c.name for c in MongoCollection])
+    args = parser.parse_args()
+
+    load_dotenv()
+    client = MongoDBClient.get_instance()
+    db = client.get_client()[client.database_name]
+    for name in args.collections:
+        print(MongoCollection[name].value, quantize_collection(db[MongoCollection[name].value], VectorQuantization(args.mode)))
+
+    print("add these fields to vector_index:")
+    print(json.dumps(quantized_index_fields(), indent=2))
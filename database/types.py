@@ -1,5 +1,6 @@
-from typing import List, Dict
+from typing import Any, List, Dict, Optional
 from typing_extensions import TypedDict
+from .enums import MongoCollection, ProjectionProfile, FusionStrategy, SearchLimitMode
 
 class Requisites(TypedDict):
     raw: str
@@ -34,3 +35,20 @@ class Program(TypedDict, total=False):
     department: str
     overview: str
     sections: Dict[str, str | List[str]]
+
+class SearchLimits(TypedDict):
+    num_candidates: int # $vectorSearch numCandidates, unused for exact search
+    limit: int # results of each branch before fusion
+    exact: bool # exact (ENN) vector search instead of approximate
+    matching: Optional[int] # documents matching the filter, if counted
+
+class SearchRequest(TypedDict, total=False):
+    """Keyword arguments of one MongoDBClient.hybrid_search call"""
+    query: str
+    collection: MongoCollection
+    n_results: int
+    filter: Dict[str, Any]
+    proj: Dict[str, Any]
+    projection: ProjectionProfile
+    fusion: FusionStrategy
+    limit_mode: SearchLimitMode
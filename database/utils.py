@@ -1,6 +1,9 @@
-from .enums import MongoCollection, MongoIndex, Faculty, Department, CourseLevel, AcademicLevel
-from typing import Any, Dict, List, Tuple
+from .enums import MongoCollection, MongoIndex, Faculty, Department, CourseLevel, AcademicLevel, VectorQuantization, FusionStrategy, SearchLimitMode, ProjectionProfile
+from .quantization import QUANTIZED_FIELDS, quantize_vector
+from .types import SearchLimits
+from typing import Any, Dict, List, Optional, Tuple
 import logging
+import re
 
 info_logger = logging.getLogger("uvicorn.info")
 
@@ -19,6 +22,135 @@ SEARCH_WEIGHTS = {
 
 RECIPROCAL_C = 60
 
+# how hybrid_search fuses the vector and full text branches, FUSION_STRATEGY overrides every collection
+FUSION_STRATEGIES = {
+  collection: FusionStrategy.SERVER for collection in MongoCollection
+}
+
+# fields never returned by hybrid_search
+RESULT_EXCLUDED_FIELDS = {
+  "_id": 0,
+  "embeddings": 0,
+  **{ field: 0 for mode, field in QUANTIZED_FIELDS.items() if field != "embeddings" },
+  "createdAt": 0,
+  "updatedAt": 0,
+  "__v": 0
+}
+
+# characters of the overview kept in a card
+CARD_OVERVIEW_LENGTH = 200
+
+def _truncated(field: str, length: int = CARD_OVERVIEW_LENGTH):
+  return { "$substrCP": [{ "$ifNull": [f"${field}", ""] }, 0, length] }
+
+# named projections applied inside hybrid_search, tools pick one per call, an empty projection keeps everything
+PROJECTION_PROFILES: Dict[MongoCollection, Dict[ProjectionProfile, Dict[str, Any]]] = {
+  MongoCollection.Course: {
+    ProjectionProfile.CARD: {
+      "id": 1, "name": 1, "credits": 1, "faculty": 1, "department": 1, "academicLevel": 1, "courseLevel": 1, "terms": 1,
+      "overview": _truncated("overview")
+    },
+    ProjectionProfile.REQUISITES: {
+      "id": 1, "name": 1, "credits": 1, "terms": 1,
+      "prerequisites": 1, "corequisites": 1, "restrictions": 1, "futureCourses": 1, "notes": 1
+    },
+    ProjectionProfile.FULL: {},
+  },
+  MongoCollection.Program: {
+    ProjectionProfile.CARD: {
+      "url": 1, "name": 1, "degree": 1, "level": 1, "faculty": 1, "department": 1,
+      "overview": _truncated("overview")
+    },
+    ProjectionProfile.REQUISITES: {
+      "url": 1, "name": 1, "degree": 1, "level": 1, "faculty": 1, "department": 1, "sections": 1
+    },
+    ProjectionProfile.FULL: {},
+  },
+  MongoCollection.General: {
+    ProjectionProfile.CARD: {},
+    ProjectionProfile.REQUISITES: {},
+    ProjectionProfile.FULL: {},
+  },
+}
+
+def resolve_projection(
+    collection: MongoCollection,
+    projection: Optional[ProjectionProfile] = None,
+    proj: Dict[str, Any] = {}
+) -> Dict[str, Any]:
+  """An explicit projection wins over the named profile"""
+  if proj or projection is None:
+    return proj
+  return PROJECTION_PROFILES[collection][projection]
+
+def generate_course_id_match(course_ids: List[str]) -> Dict[str, Any]:
+  """Exact match on course ids however they are typed, "COMP 250", "comp250" and "Comp-250" are the same course"""
+  patterns = []
+  for course_id in course_ids:
+    compact = re.sub(r"[\s-]+", "", course_id)
+    patterns.append(f"^{re.escape(compact[:4])}[\\s-]*{re.escape(compact[4:])}$")
+  return { "id": { "$regex": "|".join(patterns) or "^$", "$options": "i" } }
+
+def generate_name_match(names: List[str]) -> Dict[str, Any]:
+  """Case insensitive exact match on document names"""
+  return { "name": { "$regex": "|".join(f"^{re.escape(n.strip())}$" for n in names) or "^$", "$options": "i" } }
+
+# quantized search fetches this many times more candidates before rescoring with full precision
+RESCORE_FACTOR = 4
+
+# fixed limits of the vector and full text branches
+NUM_CANDIDATES = 100
+SEARCH_LIMIT = 20
+
+# adaptive limits, each branch returns RESULTS_LIMIT_FACTOR * n_results (at least SEARCH_LIMIT)
+# and the approximate search explores CANDIDATE_FACTOR times that
+RESULTS_LIMIT_FACTOR = 4
+CANDIDATE_FACTOR = 5
+MAX_NUM_CANDIDATES = 10000 # atlas upper bound of numCandidates
+EXACT_SEARCH_THRESHOLD = 1000 # filters matching at most this many documents are searched exactly
+
+def generate_search_limits(
+    n_results: int,
+    matching: Optional[int] = None,
+    mode: SearchLimitMode = SearchLimitMode.FIXED
+) -> SearchLimits:
+  if mode == SearchLimitMode.FIXED:
+    return { "num_candidates": NUM_CANDIDATES, "limit": SEARCH_LIMIT, "exact": False, "matching": matching }
+
+  limit = min(MAX_NUM_CANDIDATES, max(SEARCH_LIMIT, n_results * RESULTS_LIMIT_FACTOR))
+  num_candidates = min(MAX_NUM_CANDIDATES, limit * CANDIDATE_FACTOR)
+  if matching is not None:
+    # no point in asking for more than the filter can return
+    limit = max(1, min(limit, matching))
+    num_candidates = max(limit, min(num_candidates, matching))
+
+  return {
+    "num_candidates": num_candidates,
+    "limit": limit,
+    # a narrow filter leaves a small subset, scanning it exactly is cheap and has full recall
+    "exact": matching is not None and matching <= EXACT_SEARCH_THRESHOLD,
+    "matching": matching
+  }
+
+def reciprocal_rank_fusion(
+    ranked: List[Tuple[float, List[Tuple[Any, float]]]],
+    n_results: int,
+    reciprocal_c: float = RECIPROCAL_C
+) -> List[Tuple[Any, float]]:
+  """
+  Weighted reciprocal rank fusion of (weight, [(id, score), ...]) lists, each ordered by rank.
+  Same formula as the server side pipeline: weight * score / (rank + c), summed over lists.
+  """
+  scores: Dict[Any, float] = {}
+  order: Dict[Any, int] = {}
+  for weight, results in ranked:
+    for rank, (key, score) in enumerate(results):
+      scores[key] = scores.get(key, 0) + weight * score / (rank + reciprocal_c)
+      order.setdefault(key, len(order))
+
+  # ties keep first seen order so results are deterministic
+  return sorted(scores.items(), key=lambda item: (-item[1], order[item[0]]))[:n_results]
+
 def generate_vector_search_filter(
     filters: Dict[str, Any] = {}
 ):
@@ -44,6 +176,76 @@ def generate_vector_search_filter(
   # print(filter)
   # return filter
 
+def generate_vector_search_stages(
+    query_vector: List[float],
+    filters: Dict[str, Any] = {},
+    quantization: VectorQuantization = VectorQuantization.FLOAT32,
+    num_candidates: int = NUM_CANDIDATES,
+    limit: int = SEARCH_LIMIT,
+    rescore_factor: int = RESCORE_FACTOR,
+    exact: bool = False
+):
+  if quantization == VectorQuantization.FLOAT32 or exact:
+    # exact search scans the filtered subset, the full precision field is used directly
+    return [
+      {
+        "$vectorSearch": {
+          "index": "vector_index",
+          "path": "embeddings",
+          "queryVector": quantize_vector(query_vector, VectorQuantization.FLOAT32),
+          **({ "exact": True } if exact else { "numCandidates": num_candidates }),
+          "limit": limit,
+          "filter": generate_vector_search_filter(filters) # can be empty dict
+        }
+      },
+      {
+        "$addFields": {
+          "vector_search_score": { "$meta": "vectorSearchScore" }
+        }
+      }
+    ]
+
+  # search the quantized field for a larger shortlist, then rescore with the full precision embeddings
+  # the rescored value matches the scale of vectorSearchScore for dotProduct: (1 + dot) / 2
+  return [
+    {
+      "$vectorSearch": {
+        "index": "vector_index",
+        "path": QUANTIZED_FIELDS[quantization],
+        "queryVector": quantize_vector(query_vector, quantization),
+        "numCandidates": num_candidates * rescore_factor,
+        "limit": limit * rescore_factor,
+        "filter": generate_vector_search_filter(filters)
+      }
+    },
+    {
+      "$addFields": {
+        "vector_search_score": {
+          "$divide": [
+            {
+              "$add": [1, {
+                "$sum": {
+                  "$map": {
+                    "input": { "$zip": { "inputs": ["$embeddings", { "$literal": list(query_vector) }] } },
+                    "as": "pair",
+                    "in": { "$multiply": [{ "$first": "$$pair" }, { "$last": "$$pair" }] }
+                  }
+                }
+              }]
+            },
+            2
+          ]
+        }
+      }
+    },
+    {
+      "$sort": { "vector_search_score": -1 }
+    },
+    {
+      "$limit": limit
+    }
+  ]
+
 def generate_search_filter(
     filters: Dict[str, Any] = {}
 ):
@@ -59,6 +261,21 @@ def generate_search_filter(
       
   return filter
 
+def generate_full_text_search_stage(
+    query: str,
+    collection: MongoCollection,
+    filters: Dict[str, Any] = {}
+):
+  return {
+    "$search": {
+      "index": "full_text_index",
+      "compound": {
+        "should": generate_search_stage(query, collection=collection),
+        "filter": generate_search_filter(filters)
+      }
+    }
+  }
+
 def generate_search_stage(
     query: str,
     collection: MongoCollection
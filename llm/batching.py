@@ -0,0 +1,136 @@
+from langchain_core.embeddings import Embeddings
+from typing import Dict, List, Optional, Tuple, Any
+import asyncio
+import logging
+import time
+
+info_logger = logging.getLogger("uvicorn.info")
+
+PendingQuery = Tuple[str, asyncio.Future, float] # text, caller future, enqueue time
+
+class BatchMetrics:
+    """Running batch-size and queue-wait metrics of a BatchingEmbeddings dispatcher"""
+    def __init__(self):
+        self.batches = 0
+        self.items = 0
+        self.max_batch_size = 0
+        self.total_queue_wait = 0.0
+        self.max_queue_wait = 0.0
+        self.total_encode_time = 0.0
+
+    def record(self, batch_size: int, queue_waits: List[float], encode_time: float):
+        self.batches += 1
+        self.items += batch_size
+        self.max_batch_size = max(self.max_batch_size, batch_size)
+        self.total_queue_wait += sum(queue_waits)
+        self.max_queue_wait = max(self.max_queue_wait, *queue_waits)
+        self.total_encode_time += encode_time
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches > 0 else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "avg_queue_wait_ms": 1000 * self.total_queue_wait / self.items if self.items > 0 else 0.0,
+            "max_queue_wait_ms": 1000 * self.max_queue_wait,
+            "avg_encode_ms": 1000 * self.total_encode_time / self.batches if self.batches > 0 else 0.0,
+        }
+
+class BatchingEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that coalesces concurrent aembed_query calls.
+    Queries are collected for up to window_ms or max_batch_size items, then encoded by a single
+    aembed_documents call so the model runs one batched forward pass instead of one per query.
+    """
+    def __init__(self, embedding: Embeddings, window_ms: float = 5.0, max_batch_size: int = 32):
+        self.embedding = embedding
+        self.window = window_ms / 1000
+        self.max_batch_size = max(1, max_batch_size)
+        self.metrics = BatchMetrics()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue[PendingQuery]] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embedding.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.embedding.aembed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embedding.embed_query(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        self._ensure_dispatcher()
+        future = self._loop.create_future()
+        self._queue.put_nowait((text, future, time.perf_counter()))
+        return await future
+
+    def _ensure_dispatcher(self):
+        # the instance is a process wide singleton, bind the dispatcher to the loop currently running
+        loop = asyncio.get_running_loop()
+        if self._dispatcher is None or self._dispatcher.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._dispatcher = loop.create_task(self._dispatch())
+
+    async def _collect(self) -> List[PendingQuery]:
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.window
+
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        # callers may have been cancelled while waiting
+        return [item for item in batch if not item[1].done()]
+
+    async def _dispatch(self):
+        while True:
+            batch = await self._collect()
+            if len(batch) == 0:
+                continue
+
+            # identical concurrent queries are encoded once
+            texts = list(dict.fromkeys(text for text, _, _ in batch))
+            started = time.perf_counter()
+            try:
+                vectors = await self.embedding.aembed_documents(texts)
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            encode_time = time.perf_counter() - started
+
+            results = dict(zip(texts, vectors))
+            for text, future, _ in batch:
+                if not future.done():
+                    future.set_result(results[text])
+
+            self.metrics.record(len(batch), [started - enqueued for _, _, enqueued in batch], encode_time)
+            info_logger.debug(f"embedding batch: size={len(batch)} unique={len(texts)} encode={1000 * encode_time:.1f}ms")
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.metrics.stats()
+        if hasattr(self.embedding, "stats"):
+            stats["embedding"] = self.embedding.stats()
+        return stats
+
+    def cleanup(self):
+        """Stop the dispatcher, returns the batching metrics"""
+        if self._dispatcher is not None and not self._dispatcher.done():
+            self._dispatcher.cancel()
+        self._dispatcher = None
+        self._queue = None
+        self._loop = None
+        stats = self.stats()
+        if hasattr(self.embedding, "cleanup"):
+            self.embedding.cleanup()
+        return stats
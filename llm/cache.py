@@ -0,0 +1,170 @@
+from langchain_core.embeddings import Embeddings
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Any, TYPE_CHECKING
+import numpy as np
+import asyncio
+import threading
+import time
+import re
+
+if TYPE_CHECKING:
+    from llm.store import EmbeddingStore
+
+# course codes are typed as "COMP 250", "comp250" or "Comp  250", they should share one cache entry
+COURSE_CODE_PATTERN = re.compile(r"\b([a-z]{4})\s+(\d{3}[a-z0-9]{0,2})\b")
+
+def normalize_query(query: str) -> str:
+    """Normalize a query string so that trivially different queries share one cache key"""
+    query = " ".join(query.lower().split())
+    return COURSE_CODE_PATTERN.sub(r"\1\2", query)
+
+CacheKey = Tuple[str, str]
+
+class EmbeddingCache:
+    """
+    Bounded LRU cache with TTL for query embeddings.
+    Vectors are stored as float32 numpy arrays (4 bytes per dimension) instead of python lists.
+    """
+    def __init__(self, maxsize: int = 1024, ttl: float = 86400):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[CacheKey, Tuple[float, np.ndarray]] = OrderedDict()
+        self._lock = threading.Lock() # sync embed_query runs in worker threads
+
+    def get(self, model: str, query: str) -> Optional[np.ndarray]:
+        key = (model, normalize_query(query))
+        with self._lock:
+            entry = self._entries.get(key, None)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, model: str, query: str, vector: List[float] | np.ndarray):
+        if self.maxsize <= 0:
+            return
+        key = (model, normalize_query(query))
+        with self._lock:
+            self._entries[key] = (time.monotonic(), np.asarray(vector, dtype=np.float32))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total > 0 else 0.0,
+                "bytes": sum(v.nbytes for _, v in self._entries.values())
+            }
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that serves repeated queries from an EmbeddingCache,
+    backed by an optional on-disk EmbeddingStore shared across workers and restarts.
+    Documents are passed through, only the query path (used by hybrid_search) is cached.
+    """
+    def __init__(self, embedding: Embeddings, model_name: str, cache: EmbeddingCache, store: Optional["EmbeddingStore"] = None):
+        self.embedding = embedding
+        self.model_name = model_name
+        self.cache = cache
+        self.store = store
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embedding.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.embedding.aembed_documents(texts)
+
+    def _lookup(self, text: str) -> Optional[np.ndarray]:
+        vector = self.cache.get(self.model_name, text)
+        if vector is None and self.store is not None:
+            vector = self.store.get(self.model_name, text)
+            if vector is not None:
+                self.cache.put(self.model_name, text, vector)
+        return vector
+
+    async def _alookup(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """_lookup for the event loop, memory misses are read from the store in one thread hop"""
+        vectors = [self.cache.get(self.model_name, text) for text in texts]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if len(missing) > 0 and self.store is not None:
+            stored = await asyncio.to_thread(lambda: [self.store.get(self.model_name, texts[i]) for i in missing])
+            for i, vector in zip(missing, stored):
+                if vector is not None:
+                    self.cache.put(self.model_name, texts[i], vector)
+                    vectors[i] = vector
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = self._lookup(text)
+        if vector is not None:
+            return vector.tolist()
+
+        result = self.embedding.embed_query(text)
+        self.cache.put(self.model_name, text, result)
+        if self.store is not None:
+            self.store.put(self.model_name, text, result)
+        return result
+
+    async def aembed_query(self, text: str) -> List[float]:
+        vector = (await self._alookup([text]))[0]
+        if vector is not None:
+            return vector.tolist()
+
+        result = await self.embedding.aembed_query(text)
+        self.cache.put(self.model_name, text, result)
+        if self.store is not None:
+            # may wait on another worker holding the writer lock
+            await asyncio.to_thread(self.store.put, self.model_name, text, result)
+        return result
+
+    async def aembed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed several queries, cache misses are encoded together in one batch"""
+        vectors = await self._alookup(texts)
+        # one encode per normalized query, like the cache keys
+        missing = { normalize_query(text): text for text, vector in zip(texts, vectors) if vector is None }
+        if len(missing) > 0:
+            results = dict(zip(missing.keys(), await self.embedding.aembed_documents(list(missing.values()))))
+            for key, result in results.items():
+                self.cache.put(self.model_name, missing[key], result)
+                if self.store is not None:
+                    await asyncio.to_thread(self.store.put, self.model_name, missing[key], result)
+            vectors = [results[normalize_query(text)] if vector is None else vector for text, vector in zip(texts, vectors)]
+
+        return [v.tolist() if isinstance(v, np.ndarray) else v for v in vectors]
+
+    def stats(self) -> Dict[str, Any]:
+        stats = { "cache": self.cache.stats() }
+        if self.store is not None:
+            stats["store"] = self.store.stats()
+        if hasattr(self.embedding, "stats"):
+            stats["embedding"] = self.embedding.stats()
+        return stats
+
+    def cleanup(self):
+        """Release cached vectors, returns the final statistics"""
+        stats = self.stats()
+        self.cache.clear()
+        if hasattr(self.embedding, "cleanup"):
+            self.embedding.cleanup()
+        return stats
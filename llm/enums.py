@@ -14,3 +14,9 @@ class HF_EMBEDDING(enum.Enum):
   LLAMA = "meta-llama/Llama-3.1-8B"
   CHATGPT = "gpt-4o-mini"
   REMOTE = "remote"
+
+class EmbeddingBackend(enum.Enum):
+  LOCAL = "local" # HuggingFaceEmbeddings in the API process
+  PROCESS = "process" # SentenceTransformer in dedicated worker processes
+  INT8 = "int8" # torch dynamic int8 quantization, cpu only
+  ONNX = "onnx" # onnx runtime int8 export, cpu only, requires optimum[onnxruntime]
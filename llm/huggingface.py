@@ -1,9 +1,20 @@
-from langchain_huggingface import HuggingFaceEmbeddings, ChatHuggingFace, HuggingFacePipeline
+from langchain_huggingface import ChatHuggingFace, HuggingFacePipeline
 from transformers import AutoTokenizer, AutoModelForCausalLM, BitsAndBytesConfig, TextStreamer, pipeline
-from llm.enums import HF_LLM, HF_EMBEDDING
+from llm.enums import HF_LLM, HF_EMBEDDING, EmbeddingBackend
+from llm.cache import EmbeddingCache, CachedEmbeddings
+from llm.store import EmbeddingStore
+from llm.batching import BatchingEmbeddings
+from llm.process_pool import ProcessPoolEmbeddings
+from llm.quantized import load_int8_model, load_onnx_int8_model
+from llm.profiles import EncodeProfile, LengthAwareEmbeddings, get_encode_profiles
+from langchain_core.embeddings import Embeddings
+from sentence_transformers import SentenceTransformer
+from typing import List, Set
 import os
 from functools import lru_cache
+import asyncio
 import logging
+import threading
 from bson.binary import Binary, BinaryVectorDtype
 
 info_logger = logging.getLogger("uvicorn.info")
@@ -16,22 +27,66 @@ def get_huggingface_embedding(model: HF_EMBEDDING = HF_EMBEDDING.BGE):
     """Get singleton instance of HuggingFace embedding model"""
     device = os.getenv("EMBEDDING_DEVICE") or "cpu"
     model = os.getenv("EMBEDDING_MODEL") or "BAAI/bge-m3"
-    max_length = int(os.getenv("EMBEDDING_MAX_LENGTH") or 8192)
-    truncation = bool(os.getenv("EMBEDDING_TRUNCATION") or True)
+    cache_size = int(os.getenv("EMBEDDING_CACHE_SIZE") or 1024) # 0 disables the query cache
+    cache_ttl = float(os.getenv("EMBEDDING_CACHE_TTL") or 86400)
+    batch_window_ms = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS") or 5) # 0 disables micro-batching
+    max_batch_size = int(os.getenv("EMBEDDING_MAX_BATCH_SIZE") or 32)
+    store_path = os.getenv("EMBEDDING_STORE_PATH") # unset disables the on-disk store
+    store_max_entries = int(os.getenv("EMBEDDING_STORE_MAX_ENTRIES") or 50000)
+    backend = EmbeddingBackend(os.getenv("EMBEDDING_BACKEND") or EmbeddingBackend.LOCAL.value)
 
-    info_logger.info(f"Loading embedding model {model} on {device}")
+    info_logger.info(f"Loading embedding model {model} on {device} ({backend.value} backend)")
 
-    embedding = HuggingFaceEmbeddings(
+    # short queries and long documents are encoded with separate max lengths and batch sizes
+    embedding = create_embedding_backend(backend, model, device, get_encode_profiles())
+
+    # concurrent queries from different sessions are encoded together in one forward pass
+    if batch_window_ms > 0:
+        embedding = BatchingEmbeddings(embedding, window_ms=batch_window_ms, max_batch_size=max_batch_size)
+
+    # repeated queries (e.g. "COMP 250" and "comp250") skip the model entirely, also after a restart if a store is set
+    return CachedEmbeddings(
+        embedding,
         model_name=model,
-        model_kwargs={"device": device},
-        encode_kwargs={
-            "convert_to_tensor": True, 
-            "max_length": max_length, 
-            "truncation": truncation
-        }
+        cache=EmbeddingCache(maxsize=cache_size, ttl=cache_ttl),
+        store=EmbeddingStore(store_path, max_entries=store_max_entries) if store_path else None
     )
 
-    return embedding
+_embedding_lock = threading.Lock()
+_loaded_embeddings: Set[HF_EMBEDDING] = set()
+
+async def aget_huggingface_embedding(model: HF_EMBEDDING = HF_EMBEDDING.BGE):
+    """
+    get_huggingface_embedding for the event loop: the first calls load the model in a thread and wait for a single load
+    (lru_cache does not deduplicate concurrent misses), later calls return the singleton directly
+    """
+    if model in _loaded_embeddings:
+        return get_huggingface_embedding(model)
+
+    def load():
+        with _embedding_lock:
+            embedding = get_huggingface_embedding(model)
+            _loaded_embeddings.add(model)
+            return embedding
+    return await asyncio.to_thread(load)
+
+def create_embedding_backend(backend: EmbeddingBackend, model: str, device: str, profiles: List[EncodeProfile]) -> Embeddings:
+    """Create the uncached embedding model for the given backend"""
+    if backend == EmbeddingBackend.PROCESS:
+        # keeps model compute off the event loop process entirely
+        return ProcessPoolEmbeddings(
+            model_name=model,
+            device=device,
+            workers=int(os.getenv("EMBEDDING_WORKERS") or 1),
+            threads=int(os.getenv("EMBEDDING_THREADS") or 0) or None,
+            profiles=profiles
+        )
+    elif backend == EmbeddingBackend.INT8:
+        return LengthAwareEmbeddings(load_int8_model(model), profiles)
+    elif backend == EmbeddingBackend.ONNX:
+        return LengthAwareEmbeddings(load_onnx_int8_model(model), profiles)
+    else:
+        return LengthAwareEmbeddings(SentenceTransformer(model, device=device), profiles)
 
 def generate_bson_vector(vector, vector_dtype=BinaryVectorDtype.FLOAT32):
     return Binary.from_vector(vector, vector_dtype)
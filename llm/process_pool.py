@@ -0,0 +1,74 @@
+from langchain_core.embeddings import Embeddings
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Any
+from llm.profiles import EncodeProfile, encode_profiled, get_encode_profiles, profile_models
+import multiprocessing as mp
+import numpy as np
+import asyncio
+import logging
+import os
+
+info_logger = logging.getLogger("uvicorn.info")
+
+# state of a worker process, the model is loaded once by the pool initializer
+_worker_models: List[Any] = [] # one view of the model per profile
+_worker_profiles: List[EncodeProfile] = []
+
+def _init_worker(model_name: str, device: str, threads: int, profiles: List[EncodeProfile]):
+    global _worker_models, _worker_profiles
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    torch.set_num_threads(threads)
+    _worker_models = profile_models(SentenceTransformer(model_name, device=device), profiles)
+    _worker_profiles = profiles
+
+def _encode(texts: List[str]) -> np.ndarray:
+    # float32 ndarray pickles to a single buffer, much cheaper over the pipe than nested lists
+    return encode_profiled(_worker_models, texts, _worker_profiles)
+
+class ProcessPoolEmbeddings(Embeddings):
+    """
+    Embeddings backend that runs SentenceTransformer inference in dedicated worker processes.
+    Tokenization and torch overhead never hold the GIL of the API process, the event loop only awaits the result.
+    """
+    def __init__(
+            self,
+            model_name: str,
+            device: str = "cpu",
+            workers: int = 1,
+            threads: Optional[int] = None,
+            profiles: Optional[List[EncodeProfile]] = None
+        ):
+        self.model_name = model_name
+        self.workers = max(1, workers)
+        self.threads = threads or max(1, (os.cpu_count() or 1) // self.workers)
+
+        info_logger.info(f"Starting {self.workers} embedding worker(s) with {self.threads} thread(s) each")
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=mp.get_context("spawn"), # torch is not fork safe
+            initializer=_init_worker,
+            initargs=(model_name, device, self.threads, profiles or get_encode_profiles())
+        )
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._executor.submit(_encode, texts).result().tolist()
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = await asyncio.wrap_future(self._executor.submit(_encode, texts))
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+    def stats(self) -> Dict[str, Any]:
+        return { "workers": self.workers, "threads": self.threads }
+
+    def cleanup(self):
+        """Shut down the worker processes"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        return self.stats()
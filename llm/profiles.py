@@ -0,0 +1,108 @@
+from langchain_core.embeddings import Embeddings
+from collections import OrderedDict
+from typing import Dict, List, TYPE_CHECKING
+from typing_extensions import TypedDict
+import numpy as np
+import asyncio
+import copy
+import os
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+class EncodeProfile(TypedDict):
+    name: str
+    max_length: int # tokens, longer inputs are truncated
+    batch_size: int
+
+def get_encode_profiles() -> List[EncodeProfile]:
+    """Encode profiles from the environment, ordered from the shortest to the longest max_length"""
+    profiles = [
+        EncodeProfile(
+            name="query",
+            max_length=int(os.getenv("EMBEDDING_QUERY_MAX_LENGTH") or 512),
+            batch_size=int(os.getenv("EMBEDDING_QUERY_BATCH_SIZE") or 64)
+        ),
+        EncodeProfile(
+            name="document",
+            max_length=int(os.getenv("EMBEDDING_MAX_LENGTH") or 8192),
+            batch_size=int(os.getenv("EMBEDDING_DOCUMENT_BATCH_SIZE") or 4)
+        ),
+    ]
+    return sorted(profiles, key=lambda p: p["max_length"])
+
+def select_profile(text: str, profiles: List[EncodeProfile]) -> int:
+    """
+    Index of the shortest profile that fits the text without truncation.
+    A sentencepiece token covers at least one character, so characters (plus cls/sep) bound the token count
+    without running the tokenizer twice.
+    """
+    for i, profile in enumerate(profiles):
+        if len(text) + 2 <= profile["max_length"]:
+            return i
+    return len(profiles) - 1
+
+def profile_view(model: "SentenceTransformer", max_length: int) -> "SentenceTransformer":
+    """
+    A SentenceTransformer sharing the weights of `model` with its own max_seq_length and tokenizer,
+    so encodes of different profiles run concurrently without touching each other's truncation settings.
+    """
+    view = copy.copy(model)
+    view._modules = OrderedDict(model._modules)
+    name, first = next(iter(model._modules.items()))
+    first = copy.copy(first)
+    if hasattr(first, "tokenizer"):
+        # fast tokenizers keep the truncation length as state, switching it concurrently fails
+        first.tokenizer = copy.deepcopy(first.tokenizer)
+    view._modules[name] = first
+    view.max_seq_length = max_length
+    return view
+
+def profile_models(model: "SentenceTransformer", profiles: List[EncodeProfile]) -> List["SentenceTransformer"]:
+    """One model view per profile, in the order of `profiles`"""
+    return [profile_view(model, profile["max_length"]) for profile in profiles]
+
+def encode_profiled(
+        models: List["SentenceTransformer"],
+        texts: List[str],
+        profiles: List[EncodeProfile],
+        **encode_kwargs
+    ) -> np.ndarray:
+    """
+    Encode texts grouped by profile, each with the model view of its profile (see `profile_models`).
+    Within a group SentenceTransformer sorts inputs by length and pads each batch to its longest item,
+    so short queries never pay for the document max_length.
+    """
+    groups: Dict[int, List[int]] = {}
+    for i, text in enumerate(texts):
+        groups.setdefault(select_profile(text, profiles), []).append(i)
+
+    vectors = np.empty((len(texts), models[0].get_sentence_embedding_dimension()), dtype=np.float32)
+    for profile_index, indices in groups.items():
+        vectors[indices] = models[profile_index].encode(
+            [texts[i] for i in indices],
+            batch_size=profiles[profile_index]["batch_size"],
+            convert_to_numpy=True,
+            **encode_kwargs
+        )
+
+    return vectors
+
+class LengthAwareEmbeddings(Embeddings):
+    """Embeddings over a SentenceTransformer that picks the encode profile by input length"""
+    def __init__(self, model: "SentenceTransformer", profiles: List[EncodeProfile]):
+        self.model = model
+        self.profiles = profiles
+        self.models = profile_models(model, profiles)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return encode_profiled(self.models, texts, self.profiles).tolist()
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await asyncio.to_thread(self.embed_documents, texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
@@ -0,0 +1,71 @@
+from langchain_core.embeddings import Embeddings
+from typing import Dict, List, TYPE_CHECKING
+import numpy as np
+import logging
+import os
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+info_logger = logging.getLogger("uvicorn.info")
+
+def load_int8_model(model_name: str) -> "SentenceTransformer":
+    """
+    Load the embedding model with its Linear layers dynamically quantized to int8 (torch, CPU only).
+    Weights are quantized once at load time, activations per batch, so no export step is needed.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name, device="cpu")
+    torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+    return model
+
+def load_onnx_int8_model(model_name: str) -> "SentenceTransformer":
+    """
+    Load an ONNX Runtime int8 export of the embedding model, exporting it on first use.
+    Requires the optional `optimum[onnxruntime]` dependency.
+    """
+    try:
+        # sentence_transformers imports without optimum, check the backend itself
+        import optimum.onnxruntime
+        from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+    except ImportError as e:
+        raise ImportError("The onnx embedding backend requires `optimum[onnxruntime]` to be installed") from e
+
+    export_dir = os.getenv("EMBEDDING_ONNX_PATH") or os.path.join("models", model_name.replace("/", "__") + "-onnx")
+    qconfig = os.getenv("EMBEDDING_ONNX_QCONFIG") or "avx2" # arm64, avx2, avx512 or avx512_vnni
+    file_name = f"model_qint8_{qconfig}.onnx"
+
+    if not os.path.exists(os.path.join(export_dir, "onnx", file_name)):
+        info_logger.info(f"Exporting {model_name} to {export_dir} as dynamically quantized onnx ({qconfig})")
+        model = SentenceTransformer(model_name, backend="onnx", device="cpu")
+        model.save_pretrained(export_dir)
+        export_dynamic_quantized_onnx_model(model, qconfig, export_dir)
+
+    return SentenceTransformer(
+        export_dir,
+        device="cpu",
+        backend="onnx",
+        model_kwargs={ "file_name": file_name, "provider": "CPUExecutionProvider" }
+    )
+
+def check_parity(reference: Embeddings, candidate: Embeddings, texts: List[str]) -> Dict[str, float]:
+    """
+    Compare vectors of a candidate backend against the full precision reference on sample texts.
+    Vectors stored in the Atlas index are fp32, a candidate is only usable if the cosine similarity stays close to 1.
+    """
+    expected = np.asarray(reference.embed_documents(texts), dtype=np.float32)
+    actual = np.asarray(candidate.embed_documents(texts), dtype=np.float32)
+
+    expected /= np.linalg.norm(expected, axis=1, keepdims=True)
+    actual /= np.linalg.norm(actual, axis=1, keepdims=True)
+    cosine = np.sum(expected * actual, axis=1)
+
+    return {
+        "n": len(texts),
+        "mean": float(np.mean(cosine)),
+        "min": float(np.min(cosine)),
+        "p5": float(np.percentile(cosine, 5)),
+    }
@@ -0,0 +1,168 @@
+from typing import Dict, List, Optional, Tuple, Any
+from llm.cache import normalize_query
+import numpy as np
+import threading
+import hashlib
+import struct
+import fcntl
+import os
+
+DIGEST_SIZE = 16
+RECORD = struct.Struct(f"<{DIGEST_SIZE}sI") # key digest, row in the vector file
+
+class EmbeddingStore:
+    """
+    On-disk query embedding store shared by every worker of a node, survives restarts.
+
+    Layout of the store directory:
+    - CURRENT: "<generation> <dimensions>", replaced atomically on compaction
+    - vectors.<generation>.f32: append-only float32 rows, memory-mapped read-only by readers
+    - index.<generation>.bin: append-only (digest, row) records, read incrementally
+    - lock: flock held by writers, readers never lock
+
+    A vector row is always written before its index record, so readers never see a key without its vector.
+    When max_entries is reached the oldest half of the entries is evicted into a new generation.
+    """
+    def __init__(self, path: str, max_entries: int = 50000):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.max_entries = max(2, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._current: Optional[Tuple[int, int]] = None # inode and mtime of CURRENT
+        self._generation: Optional[int] = None
+        self._dimensions = 0
+        self._rows: Dict[bytes, int] = {}
+        self._index_offset = 0
+        self._vectors: Optional[np.memmap] = None
+
+    @staticmethod
+    def digest(model: str, query: str) -> bytes:
+        return hashlib.blake2b(f"{model}\0{normalize_query(query)}".encode(), digest_size=DIGEST_SIZE).digest()
+
+    def _file(self, name: str, generation: Optional[int] = None) -> str:
+        return os.path.join(self.path, name if generation is None else f"{name}.{generation}")
+
+    def _refresh(self):
+        """Pick up new generations and entries appended by other workers, caller holds self._lock"""
+        try:
+            stat = os.stat(self._file("CURRENT"))
+        except FileNotFoundError:
+            return
+
+        if (stat.st_ino, stat.st_mtime_ns) != self._current:
+            with open(self._file("CURRENT")) as f:
+                generation, dimensions = map(int, f.read().split())
+            self._current = (stat.st_ino, stat.st_mtime_ns)
+            self._generation = generation
+            self._dimensions = dimensions
+            self._rows = {}
+            self._index_offset = 0
+            self._vectors = None
+
+        index_file = self._file("index.bin", self._generation)
+        try:
+            if os.path.getsize(index_file) <= self._index_offset:
+                return
+            with open(index_file, "rb") as f:
+                f.seek(self._index_offset)
+                data = f.read()
+        except FileNotFoundError:
+            # compacted by another worker between reading CURRENT and the index, reload on the next call
+            self._current = None
+            return
+
+        n = len(data) // RECORD.size # ignore a record that is still being written
+        for digest, row in RECORD.iter_unpack(data[:n * RECORD.size]):
+            self._rows[digest] = row
+        self._index_offset += n * RECORD.size
+
+    def _vector(self, row: int) -> np.ndarray:
+        if self._vectors is None or row >= self._vectors.shape[0]:
+            vector_file = self._file("vectors.f32", self._generation)
+            n_rows = os.path.getsize(vector_file) // (4 * self._dimensions)
+            self._vectors = np.memmap(vector_file, dtype=np.float32, mode="r", shape=(n_rows, self._dimensions))
+        return self._vectors[row]
+
+    def get(self, model: str, query: str) -> Optional[np.ndarray]:
+        digest = self.digest(model, query)
+        with self._lock:
+            self._refresh()
+            row = self._rows.get(digest, None)
+            if row is None:
+                self.misses += 1
+                return None
+            try:
+                vector = np.array(self._vector(row)) # copy, the map is replaced on compaction
+            except FileNotFoundError:
+                self._current = None
+                self.misses += 1
+                return None
+            self.hits += 1
+            return vector
+
+    def put(self, model: str, query: str, vector: List[float] | np.ndarray):
+        vector = np.asarray(vector, dtype=np.float32)
+        digest = self.digest(model, query)
+
+        with self._lock, open(self._file("lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX) # serializes writers across uvicorn workers
+            try:
+                self._refresh()
+                if self._generation is None:
+                    self._write_generation(0, len(vector), [])
+                    self._refresh()
+                if digest in self._rows or len(vector) != self._dimensions:
+                    return
+                if len(self._rows) >= self.max_entries:
+                    self._compact()
+
+                row_size = 4 * self._dimensions
+                vector_file = self._file("vectors.f32", self._generation)
+                n_rows = os.path.getsize(vector_file) // row_size
+                os.truncate(vector_file, n_rows * row_size) # drop a partial row left by a crashed writer
+                with open(vector_file, "ab") as f:
+                    f.write(vector.tobytes())
+                with open(self._file("index.bin", self._generation), "ab") as f:
+                    f.write(RECORD.pack(digest, n_rows))
+                self._refresh()
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _write_generation(self, generation: int, dimensions: int, entries: List[Tuple[bytes, np.ndarray]]):
+        with open(self._file("vectors.f32", generation), "wb") as f:
+            for _, vector in entries:
+                f.write(vector.tobytes())
+        with open(self._file("index.bin", generation), "wb") as f:
+            for row, (digest, _) in enumerate(entries):
+                f.write(RECORD.pack(digest, row))
+
+        tmp = self._file("CURRENT.tmp")
+        with open(tmp, "w") as f:
+            f.write(f"{generation} {dimensions}")
+        os.replace(tmp, self._file("CURRENT"))
+
+    def _compact(self):
+        """Evict the oldest half of the entries into a new generation, caller holds the writer lock"""
+        previous = self._generation
+        kept = sorted(self._rows.items(), key=lambda item: item[1])[-(self.max_entries // 2):]
+        entries = [(digest, np.array(self._vector(row))) for digest, row in kept]
+
+        self._write_generation(previous + 1, self._dimensions, entries)
+        self._refresh()
+        # readers that still map the previous generation keep a valid mapping until they refresh
+        for name in ["vectors.f32", "index.bin"]:
+            os.remove(self._file(name, previous))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._rows),
+                "max_entries": self.max_entries,
+                "generation": self._generation,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total > 0 else 0.0,
+            }